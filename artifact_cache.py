@@ -0,0 +1,149 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_SUFFIX = '.part'
+
+def natural_key(name: str):
+    """Sort key putting 'Part 2' before 'Part 10'"""
+    return [int(token) if token.isdigit() else token for token in re.split(r'(\d+)', name)]
+
+class ArtifactCache:
+    """Size-capped LRU cache of built chapter files on disk, keyed by source and render settings.
+
+    Each entry lives in its own directory named after its key, so files keep their
+    readable names for upload; a chapter split into parts is one entry of several files.
+    Entries in use are pinned and never evicted.
+    """
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()  # key -> (paths, size), least recently used first
+        self._pins: Dict[str, int] = {}
+        self.total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evictions': 0}
+        self._load()
+
+    @classmethod
+    def from_config(cls, config) -> 'ArtifactCache':
+        """Build a cache from the ARTIFACT_CACHE_* settings in Config"""
+        return cls(config.ARTIFACT_CACHE_DIR, int(config.ARTIFACT_CACHE_MAX_MB * 1024 * 1024))
+
+    @staticmethod
+    def make_key(source: str, settings: Dict) -> str:
+        """Hash a source (chapter URL) together with the settings used to render it"""
+        material = json.dumps([source, settings], sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def key_for_path(path: str) -> str:
+        return os.path.basename(os.path.dirname(path))
+
+    def _load(self):
+        """Index the files left by earlier runs, oldest access first"""
+        os.makedirs(self.root, exist_ok=True)
+        found = []
+        for key in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, key)
+            if not os.path.isdir(entry_dir):
+                continue
+            names = os.listdir(entry_dir)
+            files = sorted((name for name in names if not name.endswith(PARTIAL_SUFFIX)), key=natural_key)
+            if not files or len(files) != len(names):
+                # Interrupted build or foreign content
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            paths = [os.path.join(entry_dir, name) for name in files]
+            stats = [os.stat(path) for path in paths]
+            found.append((max(stat.st_mtime for stat in stats), key, paths, sum(stat.st_size for stat in stats)))
+        for _, key, paths, size in sorted(found):
+            self._entries[key] = (paths, size)
+            self.total_bytes += size
+        if found:
+            logger.info(f"Artifact cache: {len(found)} entries, {self.total_bytes / 1048576:.1f} MB")
+
+    def path_for(self, key: str, filename: str) -> str:
+        """Get where a file for key will be written"""
+        entry_dir = os.path.join(self.root, key)
+        os.makedirs(entry_dir, exist_ok=True)
+        return os.path.join(entry_dir, filename)
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Get the cached files for key, in order, and mark them recently used, or None"""
+        entry = self._entries.get(key)
+        if entry and all(os.path.exists(path) for path in entry[0]):
+            self._entries.move_to_end(key)
+            for path in entry[0]:
+                os.utime(path)
+            self.stats['hits'] += 1
+            return list(entry[0])
+        if entry:
+            self._drop(key)
+        self.stats['misses'] += 1
+        return None
+
+    def add(self, key: str, paths: List[str]):
+        """Record finished files and evict least recently used entries over the size cap"""
+        if key in self._entries:
+            self._drop(key, delete=False)
+        size = sum(os.path.getsize(path) for path in paths)
+        self._entries[key] = (list(paths), size)
+        self.total_bytes += size
+        self.stats['stored'] += 1
+        self._evict()
+
+    def pin(self, key: str):
+        """Keep key's file on disk until unpinned"""
+        self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key: str):
+        remaining = self._pins.get(key, 0) - 1
+        if remaining > 0:
+            self._pins[key] = remaining
+            return
+        self._pins.pop(key, None)
+        if key not in self._entries:
+            # Never stored (failed build): clean up whatever was left behind
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+        self._evict()
+
+    def _evict(self):
+        for key in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key in self._pins:
+                continue
+            self._drop(key)
+            self.stats['evictions'] += 1
+
+    def _drop(self, key: str, delete: bool = True):
+        paths, size = self._entries.pop(key)
+        self.total_bytes -= size
+        if delete:
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+
+    def clear(self) -> int:
+        """Delete every unpinned file, returning how many were removed"""
+        keys = [key for key in self._entries if key not in self._pins]
+        for key in keys:
+            self._drop(key)
+        logger.info(f"Cleared {len(keys)} cached chapter files")
+        return len(keys)
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and disk usage"""
+        stats = dict(self.stats)
+        stats['entries'] = len(self._entries)
+        stats['bytes'] = self.total_bytes
+        stats['max_bytes'] = self.max_bytes
+        stats['pinned'] = len(self._pins)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
@@ -1,14 +1,49 @@
 import aiohttp
+import asyncio
+import codecs
 import logging
-from typing import List, Dict, Optional
+import re
+from typing import List, Dict, Optional, Union
+from conditional_cache import ConditionalCache, NotModified, NOT_MODIFIED
+from resilience import RetryPolicy, CircuitBreaker
+from html_parser import HtmlParser
+from bs4 import BeautifulSoup, SoupStrainer
+from html_stream import StreamTarget, TargetWatcher
 
 logger = logging.getLogger(__name__)
 
+CHAPTER_LABEL_RE = re.compile(r'(?:chapter|chap|ch|episode|ep)\.?\s*(\d+(?:\.\d+)?)', re.IGNORECASE)
+CHAPTER_SLUG_RE = re.compile(r'chapter-(\d+)(?:[-.](\d+))?', re.IGNORECASE)
+NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+
+def normalize_chapter_number(name: Optional[str], url: Optional[str] = None) -> Optional[float]:
+    """Get a comparable chapter number from a chapter name, falling back to its URL slug"""
+    if name:
+        match = CHAPTER_LABEL_RE.search(name) or NUMBER_RE.search(name)
+        if match:
+            return float(match.group(1) if match.groups() else match.group())
+    if url:
+        match = CHAPTER_SLUG_RE.search(url)
+        if match:
+            return float(f"{match.group(1)}.{match.group(2)}" if match.group(2) else match.group(1))
+    return None
+
 class BaseScraper:
     """Base class for site scrapers"""
+    # Elements that are "enough" for a streamed fetch to stop early; None reads the whole page
+    INFO_STREAM_TARGETS: Optional[List[StreamTarget]] = None
+    CHAPTER_LIST_STREAM_TARGETS: Optional[List[StreamTarget]] = None
+    STREAM_CHUNK_SIZE = 16384
+
     def __init__(self, site_name: str, base_url: str):
         self.site_name = site_name
         self.base_url = base_url
+        # Set by ManhwaScraperManager to enable conditional GETs, retries and the site breaker
+        self.conditional_cache: Optional[ConditionalCache] = None
+        self.retry_policy = RetryPolicy(max_attempts=1)
+        self.circuit_breaker: Optional[CircuitBreaker] = None
+        self.html_parser = HtmlParser()
+        self.stream_stats = {'streamed': 0, 'early_stops': 0, 'bytes_read': 0, 'bytes_skipped': 0}
 
     async def get_manhwa_info(self, session: aiohttp.ClientSession, url: str) -> Optional[Dict]:
         """Get manhwa information"""
@@ -18,17 +53,111 @@ class BaseScraper:
         """Get latest chapters"""
         raise NotImplementedError
 
+    def parse_chapter_list(self, html: str) -> List[Dict]:
+        """Parse chapters from a series page"""
+        raise NotImplementedError
+
     async def get_chapter_images(self, session: aiohttp.ClientSession, chapter_url: str) -> List[str]:
         """Get chapter images"""
         raise NotImplementedError
 
-    async def fetch_html(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
-        """Fetch HTML content"""
-        try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    return await response.text()
+    def parse_html(self, html: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+        """Parse HTML with the configured backend, optionally restricted to a subtree"""
+        return self.html_parser.parse(html, parse_only)
+
+    async def fetch_html(self, session: aiohttp.ClientSession, url: str, conditional: bool = False,
+                         until: Optional[List[StreamTarget]] = None) -> Union[str, NotModified, None]:
+        """Fetch HTML content, returning NOT_MODIFIED for unchanged pages when conditional
+
+        With until, the body is streamed and the download is cut off as soon as
+        every target element has been read in full.
+        """
+        cache = self.conditional_cache if conditional else None
+        headers = cache.request_headers(url) if cache else None
+        breaker = self.circuit_breaker
+        policy = self.retry_policy
+
+        for attempt in range(policy.max_attempts):
+            if breaker and not breaker.allow_request():
+                logger.warning(f"Circuit open for {self.site_name}, skipping {url}")
                 return None
-        except Exception as e:
-            logger.error(f"Error fetching {url}: {e}")
-            return None 
\ No newline at end of file
+            retry_after = None
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and cache:
+                        if breaker:
+                            breaker.record_success()
+                        cache.record_not_modified(url)
+                        return NOT_MODIFIED
+                    if response.status == 200:
+                        if until:
+                            html = await self._read_until(response, until)
+                        else:
+                            html = await response.text()
+                        if breaker:
+                            breaker.record_success()
+                        if cache and cache.check_body(url, response.headers, html):
+                            return NOT_MODIFIED
+                        return html
+                    if not policy.should_retry_status(response.status):
+                        # The site answered; a 404 and the like say nothing about its health
+                        if breaker:
+                            breaker.record_success()
+                        logger.error(f"Error fetching {url}: HTTP {response.status}")
+                        return None
+                    logger.warning(f"HTTP {response.status} fetching {url} (attempt {attempt + 1}/{policy.max_attempts})")
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Error fetching {url} (attempt {attempt + 1}/{policy.max_attempts}): {e!r}")
+            except asyncio.CancelledError:
+                if breaker:
+                    breaker.release_probe()
+                raise
+            except Exception as e:
+                # Counted so a half-open probe that fails this way still settles the circuit
+                if breaker:
+                    breaker.record_failure()
+                logger.error(f"Error fetching {url}: {e}")
+                return None
+
+            if breaker:
+                breaker.record_failure()
+                if breaker.state == CircuitBreaker.OPEN:
+                    logger.warning(f"Circuit open for {self.site_name}, giving up on {url}")
+                    return None
+            if attempt + 1 < policy.max_attempts:
+                await asyncio.sleep(policy.backoff(attempt, retry_after))
+
+        logger.error(f"Giving up on {url} after {policy.max_attempts} attempts")
+        return None
+
+    async def _read_until(self, response: aiohttp.ClientResponse, targets: List[StreamTarget]) -> str:
+        """Stream a response into an incremental tokenizer, stopping once the targets are complete"""
+        watcher = TargetWatcher(targets)
+        encoding = response.charset or 'utf-8'
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            encoding = 'utf-8'
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        parts = []
+        bytes_read = 0
+        self.stream_stats['streamed'] += 1
+        async for chunk in response.content.iter_chunked(self.STREAM_CHUNK_SIZE):
+            bytes_read += len(chunk)
+            text = decoder.decode(chunk)
+            parts.append(text)
+            watcher.feed(text)
+            if watcher.done:
+                self.stream_stats['early_stops'] += 1
+                # Drop the rest of the body; the connection cannot be reused mid-body
+                if response.content_length and 'Content-Encoding' not in response.headers:
+                    self.stream_stats['bytes_skipped'] += max(0, response.content_length - bytes_read)
+                response.close()
+                logger.debug(f"Stopped reading {response.url} after {bytes_read} bytes")
+                break
+        else:
+            parts.append(decoder.decode(b'', final=True))
+        self.stream_stats['bytes_read'] += bytes_read
+        # Ends at the targets, not at a network-timing-dependent chunk, so body hashes repeat
+        return watcher.cut(''.join(parts))
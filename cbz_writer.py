@@ -0,0 +1,41 @@
+import io
+import zipfile
+from typing import BinaryIO, Optional
+
+from PIL import Image
+
+# Image formats comic readers open from a CBZ, by Pillow format name
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+def image_extension(image_data: bytes) -> Optional[str]:
+    """File extension for an image a CBZ can carry as it is, or None; only the header is read"""
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            return EXTENSIONS.get(img.format)
+    except Exception:
+        return None
+
+class CbzWriter:
+    """Writes page images to a stream as a CBZ: a zip of images read in name order.
+
+    Images are stored as they are, without compression (they are compressed already),
+    and each is written out as soon as it is added.
+    """
+    def __init__(self, stream: BinaryIO):
+        self.zip = zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED)
+        self.pages = 0
+
+    def add_page(self, image_data: bytes, extension: str):
+        self.pages += 1
+        # Fixed timestamps keep the same pages byte-identical between builds
+        self.zip.writestr(zipfile.ZipInfo(f"{self.pages:04d}.{extension}"), image_data)
+
+    def close(self):
+        self.zip.close()
+
+    def abort(self):
+        """Abandon an unfinished archive; the stream may already be closed or about to be deleted"""
+        try:
+            self.zip.close()
+        except (OSError, ValueError):
+            pass
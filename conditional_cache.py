@@ -0,0 +1,83 @@
+import hashlib
+import logging
+from typing import Dict, Optional
+from database import ManhwaDB
+
+logger = logging.getLogger(__name__)
+
+class NotModified:
+    """Marker returned by fetch_html when a page has not changed since the last fetch"""
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'NOT_MODIFIED'
+
+NOT_MODIFIED = NotModified()
+
+class ConditionalCache:
+    """SQLite-backed ETag/Last-Modified/body-hash validators for conditional GETs"""
+    def __init__(self, db: ManhwaDB):
+        self.db = db
+        self.stats = {
+            'requests': 0,
+            'not_modified_304': 0,
+            'unchanged_body': 0,
+            'misses': 0,
+        }
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        """Build If-None-Match/If-Modified-Since headers for a URL"""
+        self.stats['requests'] += 1
+        try:
+            validators = self.db.get_http_validators(url)
+        except Exception as e:
+            logger.error(f"Error loading validators for {url}: {e}")
+            return {}
+        headers = {}
+        if validators:
+            if validators['etag']:
+                headers['If-None-Match'] = validators['etag']
+            if validators['last_modified']:
+                headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def record_not_modified(self, url: str):
+        """Count a 304 response"""
+        self.stats['not_modified_304'] += 1
+        logger.info(f"Not modified (304): {url}")
+
+    def check_body(self, url: str, response_headers, body: str) -> bool:
+        """Store fresh validators and report whether the body is unchanged"""
+        body_hash = hashlib.sha256(body.encode('utf-8', errors='replace')).hexdigest()
+        try:
+            previous = self.db.get_http_validators(url)
+            self.db.save_http_validators(
+                url,
+                response_headers.get('ETag'),
+                response_headers.get('Last-Modified'),
+                body_hash
+            )
+        except Exception as e:
+            logger.error(f"Error saving validators for {url}: {e}")
+            previous = None
+
+        if previous and previous['body_hash'] == body_hash:
+            self.stats['unchanged_body'] += 1
+            logger.info(f"Not modified (same body hash): {url}")
+            return True
+        self.stats['misses'] += 1
+        return False
+
+    def invalidate(self, url: str):
+        """Forget validators so the next fetch is processed in full"""
+        try:
+            self.db.delete_http_validators(url)
+        except Exception as e:
+            logger.error(f"Error deleting validators for {url}: {e}")
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss/304 counters"""
+        stats = dict(self.stats)
+        stats['hits'] = stats['not_modified_304'] + stats['unchanged_body']
+        return stats
@@ -6,6 +6,68 @@ class Config:
         self.DATABASE_PATH = os.environ.get("DATABASE_PATH", "data/manhwa.db")
         self.TEMP_DIR = os.environ.get("TEMP_DIR", "temp")
         self.WATERMARK_TEXT = os.environ.get("WATERMARK_TEXT", "Personal use only - ManhwaBot")
+        # Shared HTTP connection pool
+        self.HTTP_LIMIT = int(os.environ.get("HTTP_LIMIT", "64"))
+        self.HTTP_LIMIT_PER_HOST = int(os.environ.get("HTTP_LIMIT_PER_HOST", "8"))
+        self.HTTP_KEEPALIVE_SECONDS = float(os.environ.get("HTTP_KEEPALIVE_SECONDS", "60"))
+        self.HTTP_DNS_TTL_SECONDS = int(os.environ.get("HTTP_DNS_TTL_SECONDS", "300"))
+        self.HTTP_TIMEOUT_SECONDS = float(os.environ.get("HTTP_TIMEOUT_SECONDS", "60"))
+        self.HTTP_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("HTTP_CONNECT_TIMEOUT_SECONDS", "15"))
+        # Image download scheduler
+        self.DOWNLOAD_CONCURRENCY = int(os.environ.get("DOWNLOAD_CONCURRENCY", "16"))
+        self.DOWNLOAD_PER_HOST = int(os.environ.get("DOWNLOAD_PER_HOST", "6"))
+        # HTML parser backend: auto (lxml when installed), lxml or html.parser
+        self.HTML_PARSER = os.environ.get("HTML_PARSER", "auto")
+        # Parsed result cache (TTLs in seconds)
+        self.CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "512"))
+        self.CACHE_TTL_CHAPTERS = float(os.environ.get("CACHE_TTL_CHAPTERS", "300"))
+        self.CACHE_TTL_IMAGES = float(os.environ.get("CACHE_TTL_IMAGES", "86400"))
+        self.CACHE_TTL_INFO = float(os.environ.get("CACHE_TTL_INFO", "3600"))
+        # Retry policy and per-site circuit breaker
+        self.RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", "3"))
+        self.RETRY_BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", "0.5"))
+        self.RETRY_MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", "10"))
+        self.BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+        self.BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", "60"))
+        # Adaptive update polling (hours); UPDATE_INTERVAL_HOURS is used until a series has a release history
+        self.UPDATE_INTERVAL_HOURS = float(os.environ.get("UPDATE_INTERVAL_HOURS", "6"))
+        self.POLL_MIN_INTERVAL_HOURS = float(os.environ.get("POLL_MIN_INTERVAL_HOURS", "1"))
+        self.POLL_MAX_INTERVAL_HOURS = float(os.environ.get("POLL_MAX_INTERVAL_HOURS", "72"))
+        self.POLL_TICK_SECONDS = float(os.environ.get("POLL_TICK_SECONDS", "60"))
+        # On-disk cache of built chapter files
+        self.ARTIFACT_CACHE_DIR = os.environ.get("ARTIFACT_CACHE_DIR", os.path.join(self.TEMP_DIR, "chapters"))
+        self.ARTIFACT_CACHE_MAX_MB = float(os.environ.get("ARTIFACT_CACHE_MAX_MB", "2048"))
+        # Durable job queue for chapter builds and deliveries
+        self.JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+        self.JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "600"))
+        self.JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+        self.JOB_RETRY_BASE_SECONDS = float(os.environ.get("JOB_RETRY_BASE_SECONDS", "30"))
+        self.JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "5"))
+        # Page rendering processes (0 renders in a thread) and tasks per process before the pool is recycled
+        self.RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.RENDER_MAX_TASKS_PER_CHILD = int(os.environ.get("RENDER_MAX_TASKS_PER_CHILD", "50"))
+        # Render profile for users who have not picked one: mobile, standard or archive
+        self.RENDER_PROFILE = os.environ.get("RENDER_PROFILE", "standard")
+        # File format for users who have not picked one (pdf or cbz), and whether CBZs get the
+        # watermark on their first page (first) or not at all (none)
+        self.OUTPUT_FORMAT = os.environ.get("OUTPUT_FORMAT", "pdf")
+        self.CBZ_WATERMARK = os.environ.get("CBZ_WATERMARK", "first")
+        # Largest chapter file to send; bigger chapters go out as "Part 1", "Part 2"... (Telegram caps bot uploads at 50 MB)
+        self.UPLOAD_PART_MAX_MB = float(os.environ.get("UPLOAD_PART_MAX_MB", "49"))
+        # Pages of a chapter downloaded or rendered ahead of the one being written to the PDF
+        self.PDF_PAGE_WINDOW = int(os.environ.get("PDF_PAGE_WINDOW", "6"))
+        # Chapters waiting between stages of the scrape -> download -> render -> upload pipeline
+        self.PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "1"))
+        # Outgoing Telegram rate limits (messages per second unless noted)
+        self.TG_GLOBAL_RATE = float(os.environ.get("TG_GLOBAL_RATE", "30"))
+        self.TG_CHAT_RATE = float(os.environ.get("TG_CHAT_RATE", "1"))
+        self.TG_CHAT_BURST = float(os.environ.get("TG_CHAT_BURST", "3"))
+        self.TG_GROUP_PER_MINUTE = float(os.environ.get("TG_GROUP_PER_MINUTE", "20"))
+        self.TG_MAX_RETRIES = int(os.environ.get("TG_MAX_RETRIES", "3"))
+        # Update sweep: series checked at once overall and per site, and delivery workers
+        self.SWEEP_WORKERS = int(os.environ.get("SWEEP_WORKERS", "8"))
+        self.SWEEP_SITE_CONCURRENCY = int(os.environ.get("SWEEP_SITE_CONCURRENCY", "3"))
+        self.SWEEP_DELIVERY_WORKERS = int(os.environ.get("SWEEP_DELIVERY_WORKERS", "2"))
 
     def validate(self):
         if not self.BOT_TOKEN:
@@ -1,8 +1,50 @@
 import sqlite3
 import logging
+from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+SUBSCRIPTION_QUERY = """
+    SELECT s.id, s.name, s.url, s.site_name, sub.telegram_user_id, sub.last_chapter_url, sub.last_chapter_name
+    FROM subscriptions sub JOIN series s ON s.id = sub.series_id
+"""
+
+def canonical_series_url(url: str) -> str:
+    """Normalize a series URL so every spelling of one series maps to a single row"""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return f"https://{host}{parsed.path.rstrip('/')}"
+
+def telegram_part_key(artifact_key: str, number: int) -> str:
+    """telegram_files key of a chapter file's part; the first part uses the chapter's own key"""
+    return artifact_key if number == 1 else f"{artifact_key}#{number}"
+
+class Series:
+    """A tracked series, scraped once for all of its subscribers"""
+    def __init__(self, id, name, url, site_name, last_chapter_url, last_chapter_name):
+        self.id = id
+        self.name = name
+        self.url = url
+        self.site_name = site_name
+        self.last_chapter_url = last_chapter_url
+        self.last_chapter_name = last_chapter_name
+        self.next_check_at = None
+        # Subscriber id -> (last chapter url, last chapter name) that user received
+        self.subscribers = {}
+
+class Manhwa:
+    """A series as seen by one subscriber, with that user's progress"""
+    def __init__(self, series_id, name, url, site_name, telegram_user_id, last_chapter_url, last_chapter_name):
+        self.series_id = series_id
+        self.name = name
+        self.url = url
+        self.site_name = site_name
+        self.telegram_user_id = telegram_user_id
+        self.last_chapter_url = last_chapter_url
+        self.last_chapter_name = last_chapter_name
+
 class ManhwaDB:
     def __init__(self, db_path: str = "data/manhwa.db"):
         self.db_path = db_path
@@ -23,78 +65,228 @@ class ManhwaDB:
         """Initialize database tables"""
         with self:
             self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS manhwa (
+                CREATE TABLE IF NOT EXISTS series (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
+                    canonical_url TEXT NOT NULL UNIQUE,
                     url TEXT NOT NULL,
+                    name TEXT NOT NULL,
                     site_name TEXT NOT NULL,
+                    last_chapter_url TEXT,
+                    last_chapter_name TEXT,
+                    last_checked_at TEXT,
+                    next_check_at TEXT
+                )
+            """)
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS subscriptions (
                     telegram_user_id INTEGER NOT NULL,
+                    series_id INTEGER NOT NULL REFERENCES series(id) ON DELETE CASCADE,
                     last_chapter_url TEXT,
-                    last_chapter_name TEXT
+                    last_chapter_name TEXT,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (telegram_user_id, series_id)
+                )
+            """)
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    telegram_user_id INTEGER PRIMARY KEY,
+                    output_channel_id TEXT
+                )
+            """)
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS http_validators (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body_hash TEXT,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS chapters (
+                    series_url TEXT NOT NULL,
+                    chapter_url TEXT NOT NULL,
+                    chapter_number REAL,
+                    name TEXT,
+                    first_seen_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (series_url, chapter_url)
                 )
             """)
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS telegram_files (
+                    artifact_key TEXT PRIMARY KEY,
+                    file_id TEXT NOT NULL,
+                    file_unique_id TEXT,
+                    file_size INTEGER,
+                    uploaded_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 5,
+                    ordering_key TEXT,
+                    dedupe_key TEXT,
+                    run_after TEXT DEFAULT CURRENT_TIMESTAMP,
+                    lease_until TEXT,
+                    last_error TEXT,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, priority, id)")
+            # At most one unfinished job per dedupe key
+            self.cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key)
+                WHERE dedupe_key IS NOT NULL AND state IN ('queued', 'running')
+            """)
+            self._migrate_manhwa_table()
+            self._add_missing_columns('series', {'last_checked_at': 'TEXT', 'next_check_at': 'TEXT'})
+            self._add_missing_columns('users', {'render_profile': 'TEXT', 'output_format': 'TEXT'})
+            # On a chapter's first part: how many parts it has; 0 while still uploading, NULL means one
+            self._add_missing_columns('telegram_files', {'parts': 'INTEGER'})
             logger.info("Database tables initialized.")
 
+    def _migrate_manhwa_table(self):
+        """Move rows of the old one-user-per-series manhwa table into series and subscriptions"""
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'manhwa'")
+        if not self.cursor.fetchone():
+            return
+        self.cursor.execute("SELECT name, url, site_name, telegram_user_id, last_chapter_url, last_chapter_name FROM manhwa")
+        rows = self.cursor.fetchall()
+        for name, url, site_name, telegram_user_id, last_chapter_url, last_chapter_name in rows:
+            series_id = self._upsert_series(name, url, site_name, last_chapter_url, last_chapter_name)
+            self.cursor.execute("""
+                INSERT OR IGNORE INTO subscriptions (telegram_user_id, series_id, last_chapter_url, last_chapter_name)
+                VALUES (?, ?, ?, ?)
+            """, (telegram_user_id, series_id, last_chapter_url, last_chapter_name))
+        # Keep the old rows around, but out of the way of future migrations
+        self.cursor.execute("ALTER TABLE manhwa RENAME TO manhwa_legacy")
+        logger.info(f"Migrated {len(rows)} manhwa rows to series and subscriptions")
+
+    def _add_missing_columns(self, table: str, columns):
+        """Add columns introduced after a table was first created"""
+        self.cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in self.cursor.fetchall()}
+        for column, column_type in columns.items():
+            if column not in existing:
+                self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def _upsert_series(self, name: str, url: str, site_name: str, last_chapter_url: str = "", last_chapter_name: str = "") -> int:
+        """Get the id of the series at url, creating it if needed"""
+        canonical_url = canonical_series_url(url)
+        self.cursor.execute("""
+            INSERT OR IGNORE INTO series (canonical_url, url, name, site_name, last_chapter_url, last_chapter_name)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (canonical_url, url, name, site_name, last_chapter_url, last_chapter_name))
+        self.cursor.execute("SELECT id FROM series WHERE canonical_url = ?", (canonical_url,))
+        return self.cursor.fetchone()[0]
+
     def add_manhwa(self, name: str, url: str, site_name: str, telegram_user_id: int, last_chapter_url: str = "", last_chapter_name: str = ""):
-        """Add a new manhwa to track"""
+        """Subscribe a user to a series, creating the series if nobody tracks it yet"""
         with self:
+            series_id = self._upsert_series(name, url, site_name, last_chapter_url, last_chapter_name)
             try:
                 self.cursor.execute("""
-                    INSERT INTO manhwa (name, url, site_name, telegram_user_id, last_chapter_url, last_chapter_name)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (name, url, site_name, telegram_user_id, last_chapter_url, last_chapter_name))
-                logger.info(f"Added manhwa: {name}")
+                    INSERT INTO subscriptions (telegram_user_id, series_id, last_chapter_url, last_chapter_name)
+                    VALUES (?, ?, ?, ?)
+                """, (telegram_user_id, series_id, last_chapter_url, last_chapter_name))
+                logger.info(f"Added manhwa: {name} for user {telegram_user_id}")
                 return True
             except sqlite3.IntegrityError:
-                logger.warning(f"Manhwa already exists: {name}")
+                logger.warning(f"Manhwa already tracked by user {telegram_user_id}: {name}")
                 return False
 
-    def get_all_manhwa(self):
-        """Get all tracked manhwa"""
+    def get_all_series(self, due_at: str | None = None):
+        """Get every series with at least one subscriber, optionally only those due for a check by due_at"""
         with self:
-            self.cursor.execute("SELECT name, url, site_name, telegram_user_id, last_chapter_url, last_chapter_name FROM manhwa")
-            rows = self.cursor.fetchall()
-            # Convert rows to objects or dicts for easier access
-            class Manhwa:
-                def __init__(self, name, url, site_name, telegram_user_id, last_chapter_url, last_chapter_name):
-                    self.name = name
-                    self.url = url
-                    self.site_name = site_name
-                    self.telegram_user_id = telegram_user_id
-                    self.last_chapter_url = last_chapter_url
-                    self.last_chapter_name = last_chapter_name
-            return [Manhwa(*row) for row in rows]
-
-    def get_manhwa_by_name(self, name: str):
-        """Get a specific manhwa by name"""
-        with self:
-            self.cursor.execute("SELECT name, url, site_name, telegram_user_id, last_chapter_url, last_chapter_name FROM manhwa WHERE name = ?", (name,))
+            self.cursor.execute(SUBSCRIPTION_QUERY + " ORDER BY s.id")
+            series = {}
+            for series_id, name, url, site_name, telegram_user_id, last_chapter_url, last_chapter_name in self.cursor.fetchall():
+                if series_id not in series:
+                    series[series_id] = Series(series_id, name, url, site_name, None, None)
+                series[series_id].subscribers[telegram_user_id] = (last_chapter_url, last_chapter_name)
+            self.cursor.execute("SELECT id, last_chapter_url, last_chapter_name, next_check_at FROM series")
+            for series_id, last_chapter_url, last_chapter_name, next_check_at in self.cursor.fetchall():
+                if series_id in series:
+                    series[series_id].last_chapter_url = last_chapter_url
+                    series[series_id].last_chapter_name = last_chapter_name
+                    series[series_id].next_check_at = next_check_at
+            if due_at is not None:
+                return [s for s in series.values() if s.next_check_at is None or s.next_check_at <= due_at]
+            return list(series.values())
+
+    def get_user_manhwa(self, telegram_user_id: int):
+        """Get the series a user is subscribed to, with the user's own progress"""
+        with self:
+            self.cursor.execute(SUBSCRIPTION_QUERY + " WHERE sub.telegram_user_id = ?", (telegram_user_id,))
+            return [Manhwa(*row) for row in self.cursor.fetchall()]
+
+    def get_manhwa_by_name(self, name: str, telegram_user_id: int):
+        """Get a specific manhwa a user is subscribed to by name"""
+        with self:
+            self.cursor.execute(
+                SUBSCRIPTION_QUERY + " WHERE sub.telegram_user_id = ? AND s.name = ?",
+                (telegram_user_id, name)
+            )
             row = self.cursor.fetchone()
-            if row:
-                class Manhwa:
-                    def __init__(self, name, url, site_name, telegram_user_id, last_chapter_url, last_chapter_name):
-                        self.name = name
-                        self.url = url
-                        self.site_name = site_name
-                        self.telegram_user_id = telegram_user_id
-                        self.last_chapter_url = last_chapter_url
-                        self.last_chapter_name = last_chapter_name
-                return Manhwa(*row)
-            return None
+            return Manhwa(*row) if row else None
+
+    def update_manhwa_progress(self, series_id: int, telegram_user_id: int, last_chapter_url: str, last_chapter_name: str):
+        """Update the last chapter a subscriber received"""
+        with self:
+            self.cursor.execute("""
+                UPDATE subscriptions SET last_chapter_url = ?, last_chapter_name = ?
+                WHERE series_id = ? AND telegram_user_id = ?
+            """, (last_chapter_url, last_chapter_name, series_id, telegram_user_id))
+            logger.info(f"Updated progress of user {telegram_user_id} for series {series_id} to {last_chapter_name}")
+
+    def update_series_progress(self, series_id: int, last_chapter_url: str, last_chapter_name: str):
+        """Update the last chapter delivered for a series"""
+        with self:
+            self.cursor.execute("UPDATE series SET last_chapter_url = ?, last_chapter_name = ? WHERE id = ?",
+                                (last_chapter_url, last_chapter_name, series_id))
+
+    def set_next_check(self, series_id: int, checked_at: str, next_check_at: str):
+        """Record when a series was checked and when it is due again"""
+        with self:
+            self.cursor.execute("UPDATE series SET last_checked_at = ?, next_check_at = ? WHERE id = ?",
+                                (checked_at, next_check_at, series_id))
 
-    def update_manhwa_progress(self, name: str, last_chapter_url: str, last_chapter_name: str):
-        """Update the last read chapter for a manhwa"""
+    def get_next_check_at(self) -> str | None:
+        """Get the earliest scheduled check among subscribed series"""
         with self:
-            self.cursor.execute("UPDATE manhwa SET last_chapter_url = ?, last_chapter_name = ? WHERE name = ?",
-                                (last_chapter_url, last_chapter_name, name))
-            logger.info(f"Updated progress for {name} to {last_chapter_name}")
+            self.cursor.execute("""
+                SELECT MIN(next_check_at) FROM series
+                WHERE id IN (SELECT series_id FROM subscriptions)
+            """)
+            row = self.cursor.fetchone()
+            return row[0] if row else None
 
-    def remove_manhwa(self, name: str):
-        """Remove a manhwa from tracking"""
+    def get_release_times(self, series_url: str, limit: int = 20):
+        """Get the distinct times new chapters of a series were first seen, oldest first"""
         with self:
-            self.cursor.execute("DELETE FROM manhwa WHERE name = ?", (name,))
+            self.cursor.execute("""
+                SELECT DISTINCT first_seen_at FROM chapters
+                WHERE series_url = ?
+                ORDER BY first_seen_at DESC LIMIT ?
+            """, (series_url, limit))
+            return [row[0] for row in reversed(self.cursor.fetchall())]
+
+    def remove_manhwa(self, name: str, telegram_user_id: int):
+        """Unsubscribe a user from a series"""
+        with self:
+            self.cursor.execute("""
+                DELETE FROM subscriptions
+                WHERE telegram_user_id = ? AND series_id IN (SELECT id FROM series WHERE name = ?)
+            """, (telegram_user_id, name))
             if self.cursor.rowcount > 0:
-                logger.info(f"Removed manhwa: {name}")
+                logger.info(f"Removed manhwa: {name} for user {telegram_user_id}")
                 return True
             return False
 
@@ -120,3 +312,245 @@ class ManhwaDB:
             self.cursor.execute("SELECT output_channel_id FROM users WHERE telegram_user_id = ?", (telegram_user_id,))
             row = self.cursor.fetchone()
             return row[0] if row else None
+
+    def set_user_render_profile(self, telegram_user_id: int, profile: str):
+        """Set or update the render profile a user's chapters are built with"""
+        with self:
+            try:
+                self.cursor.execute("""
+                    INSERT INTO users (telegram_user_id, render_profile)
+                    VALUES (?, ?)
+                    ON CONFLICT(telegram_user_id) DO UPDATE SET
+                    render_profile = excluded.render_profile
+                """, (telegram_user_id, profile))
+                logger.info(f"Set render profile for user {telegram_user_id} to {profile}")
+                return True
+            except Exception as e:
+                logger.error(f"Error setting render profile for user {telegram_user_id}: {e}")
+                return False
+
+    def get_user_render_profile(self, telegram_user_id: int) -> str | None:
+        """Get the render profile a user picked, if any"""
+        with self:
+            self.cursor.execute("SELECT render_profile FROM users WHERE telegram_user_id = ?", (telegram_user_id,))
+            row = self.cursor.fetchone()
+            return row[0] if row else None
+
+    def set_user_output_format(self, telegram_user_id: int, output_format: str):
+        """Set or update the file format (pdf or cbz) a user's chapters are sent as"""
+        with self:
+            try:
+                self.cursor.execute("""
+                    INSERT INTO users (telegram_user_id, output_format)
+                    VALUES (?, ?)
+                    ON CONFLICT(telegram_user_id) DO UPDATE SET
+                    output_format = excluded.output_format
+                """, (telegram_user_id, output_format))
+                logger.info(f"Set output format for user {telegram_user_id} to {output_format}")
+                return True
+            except Exception as e:
+                logger.error(f"Error setting output format for user {telegram_user_id}: {e}")
+                return False
+
+    def get_user_output_format(self, telegram_user_id: int) -> str | None:
+        """Get the file format a user picked, if any"""
+        with self:
+            self.cursor.execute("SELECT output_format FROM users WHERE telegram_user_id = ?", (telegram_user_id,))
+            row = self.cursor.fetchone()
+            return row[0] if row else None
+
+    def get_http_validators(self, url: str):
+        """Get the stored conditional-GET validators for a URL"""
+        with self:
+            self.cursor.execute("SELECT etag, last_modified, body_hash FROM http_validators WHERE url = ?", (url,))
+            row = self.cursor.fetchone()
+            if row:
+                return {'etag': row[0], 'last_modified': row[1], 'body_hash': row[2]}
+            return None
+
+    def save_http_validators(self, url: str, etag: str | None, last_modified: str | None, body_hash: str | None):
+        """Store conditional-GET validators for a URL"""
+        with self:
+            self.cursor.execute("""
+                INSERT INTO http_validators (url, etag, last_modified, body_hash, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(url) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                body_hash = excluded.body_hash,
+                updated_at = excluded.updated_at
+            """, (url, etag, last_modified, body_hash))
+
+    def delete_http_validators(self, url: str):
+        """Forget the conditional-GET validators for a URL"""
+        with self:
+            self.cursor.execute("DELETE FROM http_validators WHERE url = ?", (url,))
+
+    def get_known_chapters(self, series_url: str):
+        """Get the indexed chapter URLs of a series and, per normalized chapter number, the URLs indexed with it"""
+        with self:
+            self.cursor.execute("SELECT chapter_url, chapter_number FROM chapters WHERE series_url = ?", (series_url,))
+            rows = self.cursor.fetchall()
+            urls = {row[0] for row in rows}
+            numbers = {}
+            for url, number in rows:
+                if number is not None:
+                    numbers.setdefault(number, set()).add(url)
+            return urls, numbers
+
+    def add_known_chapters(self, series_url: str, chapters):
+        """Add chapters to a series' index; chapters need name, url and number keys"""
+        with self:
+            self.cursor.executemany("""
+                INSERT OR IGNORE INTO chapters (series_url, chapter_url, chapter_number, name)
+                VALUES (?, ?, ?, ?)
+            """, [(series_url, chapter['url'], chapter.get('number'), chapter['name']) for chapter in chapters])
+
+    def get_telegram_file_id(self, artifact_key: str) -> str | None:
+        """Get the Telegram file_id of an uploaded chapter file"""
+        with self:
+            self.cursor.execute("SELECT file_id FROM telegram_files WHERE artifact_key = ?", (artifact_key,))
+            row = self.cursor.fetchone()
+            return row[0] if row else None
+
+    def get_telegram_file_ids(self, artifact_key: str) -> list[str] | None:
+        """Get the file_ids of every part of a chapter file, in order, or None unless all are known"""
+        with self:
+            self.cursor.execute("SELECT file_id, parts FROM telegram_files WHERE artifact_key = ?", (artifact_key,))
+            row = self.cursor.fetchone()
+            if not row or row[1] == 0:
+                return None
+            file_ids = [row[0]]
+            for number in range(2, (row[1] or 1) + 1):
+                self.cursor.execute("SELECT file_id FROM telegram_files WHERE artifact_key = ?",
+                                    (telegram_part_key(artifact_key, number),))
+                part = self.cursor.fetchone()
+                if not part:
+                    return None
+                file_ids.append(part[0])
+            return file_ids
+
+    def save_telegram_file(self, artifact_key: str, file_id: str, file_unique_id: str | None, file_size: int | None,
+                           parts: int | None = None):
+        """Remember the file_id Telegram assigned to an uploaded chapter file (or part, see telegram_part_key)"""
+        with self:
+            self.cursor.execute("""
+                INSERT INTO telegram_files (artifact_key, file_id, file_unique_id, file_size, parts, uploaded_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(artifact_key) DO UPDATE SET
+                file_id = excluded.file_id,
+                file_unique_id = excluded.file_unique_id,
+                file_size = excluded.file_size,
+                parts = excluded.parts,
+                uploaded_at = excluded.uploaded_at
+            """, (artifact_key, file_id, file_unique_id, file_size, parts))
+
+    def set_telegram_file_parts(self, artifact_key: str, parts: int):
+        """Record how many parts a chapter file has once its last part is uploaded"""
+        with self:
+            self.cursor.execute("UPDATE telegram_files SET parts = ? WHERE artifact_key = ?", (parts, artifact_key))
+
+    def delete_telegram_file(self, artifact_key: str):
+        """Forget the file_ids of a chapter file, all parts included, that Telegram no longer accepts"""
+        with self:
+            self.cursor.execute("DELETE FROM telegram_files WHERE artifact_key = ? OR artifact_key LIKE ?",
+                                (artifact_key, artifact_key + '#%'))
+
+    def enqueue_job(self, kind: str, payload: str, priority: int, max_attempts: int,
+                    ordering_key: str | None = None, dedupe_key: str | None = None) -> int | None:
+        """Queue a job, returning its id, or None if an unfinished job has the same dedupe key"""
+        with self:
+            try:
+                self.cursor.execute("""
+                    INSERT INTO jobs (kind, payload, priority, max_attempts, ordering_key, dedupe_key)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (kind, payload, priority, max_attempts, ordering_key, dedupe_key))
+                return self.cursor.lastrowid
+            except sqlite3.IntegrityError:
+                return None
+
+    def claim_job(self, lease_seconds: float):
+        """Lease the next runnable job: queued and due, or running with an expired lease.
+
+        A job waits while an earlier unfinished job shares its ordering key.
+        Returns (id, kind, payload, attempts, max_attempts) or None.
+        """
+        with self:
+            self.cursor.execute("""
+                SELECT id FROM jobs j
+                WHERE ((state = 'queued' AND run_after <= CURRENT_TIMESTAMP)
+                       OR (state = 'running' AND lease_until < CURRENT_TIMESTAMP))
+                AND NOT EXISTS (
+                    SELECT 1 FROM jobs earlier
+                    WHERE earlier.ordering_key = j.ordering_key AND earlier.id < j.id
+                    AND earlier.state IN ('queued', 'running')
+                )
+                ORDER BY priority, id LIMIT 1
+            """)
+            row = self.cursor.fetchone()
+            if not row:
+                return None
+            self.cursor.execute("""
+                UPDATE jobs SET state = 'running', attempts = attempts + 1,
+                lease_until = datetime('now', ?), updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (f"+{int(lease_seconds)} seconds", row[0]))
+            self.cursor.execute("SELECT id, kind, payload, attempts, max_attempts FROM jobs WHERE id = ?", (row[0],))
+            return self.cursor.fetchone()
+
+    def extend_job_lease(self, job_id: int, lease_seconds: float):
+        """Push back the lease of a job that is still being worked on"""
+        with self:
+            self.cursor.execute("UPDATE jobs SET lease_until = datetime('now', ?) WHERE id = ? AND state = 'running'",
+                                (f"+{int(lease_seconds)} seconds", job_id))
+
+    def update_job_payload(self, job_id: int, payload: str):
+        """Checkpoint a running job's progress"""
+        with self:
+            self.cursor.execute("UPDATE jobs SET payload = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (payload, job_id))
+
+    def complete_job(self, job_id: int):
+        """Mark a job done"""
+        with self:
+            self.cursor.execute("""
+                UPDATE jobs SET state = 'done', lease_until = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (job_id,))
+
+    def fail_job(self, job_id: int, error: str, retry_in: float | None):
+        """Requeue a failed job after retry_in seconds, or mark it failed for good when None"""
+        with self:
+            if retry_in is None:
+                self.cursor.execute("""
+                    UPDATE jobs SET state = 'failed', lease_until = NULL, last_error = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (error, job_id))
+            else:
+                self.cursor.execute("""
+                    UPDATE jobs SET state = 'queued', lease_until = NULL, last_error = ?,
+                    run_after = datetime('now', ?), updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (error, f"+{int(retry_in)} seconds", job_id))
+
+    def release_job_leases(self) -> int:
+        """Requeue every running job, returning how many there were"""
+        with self:
+            self.cursor.execute("""
+                UPDATE jobs SET state = 'queued', lease_until = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE state = 'running'
+            """)
+            return self.cursor.rowcount
+
+    def get_job_counts(self):
+        """Get the number of jobs in each state"""
+        with self:
+            self.cursor.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+            return dict(self.cursor.fetchall())
+
+    def prune_jobs(self, days: int = 7) -> int:
+        """Delete finished jobs older than the given number of days"""
+        with self:
+            self.cursor.execute("""
+                DELETE FROM jobs WHERE state IN ('done', 'failed') AND updated_at < datetime('now', ?)
+            """, (f"-{int(days)} days",))
+            return self.cursor.rowcount
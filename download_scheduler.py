@@ -0,0 +1,140 @@
+import aiohttp
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from http_client import HttpClient
+from resilience import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+# Lower numbers are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+class PrioritySemaphore:
+    """Semaphore that hands free slots to the lowest priority number first"""
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: int = PRIORITY_BACKGROUND):
+        """Wait for a slot, queueing behind waiters of the same or higher priority"""
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # A slot granted right before cancellation must be passed on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """Give the slot to the next live waiter, or return it to the pool"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+class DownloadScheduler:
+    """Shared image downloader with global and per-host concurrency caps"""
+    def __init__(self, http: HttpClient, max_concurrency: int = 16, per_host: int = 6,
+                 retry_policy: Optional[RetryPolicy] = None):
+        self.http = http
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1)
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self._global = PrioritySemaphore(max_concurrency)
+        self._hosts: Dict[str, PrioritySemaphore] = {}
+        self.in_flight = 0
+        self.stats = {
+            'downloads': 0,
+            'failures': 0,
+            'retries': 0,
+            'bytes': 0,
+            'interactive': 0,
+            'background': 0,
+            'peak_in_flight': 0,
+        }
+
+    @classmethod
+    def from_config(cls, http: HttpClient, config) -> 'DownloadScheduler':
+        """Build a scheduler from the DOWNLOAD_* settings in Config"""
+        return cls(http, max_concurrency=config.DOWNLOAD_CONCURRENCY, per_host=config.DOWNLOAD_PER_HOST,
+                   retry_policy=RetryPolicy.from_config(config))
+
+    def _host_slot(self, url: str) -> PrioritySemaphore:
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = PrioritySemaphore(self.per_host)
+        return self._hosts[host]
+
+    async def fetch(self, url: str, priority: int = PRIORITY_BACKGROUND) -> Optional[bytes]:
+        """Download a single URL, retrying transient failures without holding a slot"""
+        policy = self.retry_policy
+        for attempt in range(policy.max_attempts):
+            data, retryable, retry_after = await self._fetch_once(url, priority)
+            if data is not None:
+                return data
+            if not retryable or attempt + 1 >= policy.max_attempts:
+                break
+            self.stats['retries'] += 1
+            await asyncio.sleep(policy.backoff(attempt, retry_after))
+        self.stats['failures'] += 1
+        return None
+
+    async def _fetch_once(self, url: str, priority: int):
+        """Make one download attempt once a host slot and a global slot are free"""
+        # Take the host slot first so a busy host never holds global slots idle
+        host_slot = self._host_slot(url)
+        await host_slot.acquire(priority)
+        try:
+            await self._global.acquire(priority)
+            try:
+                self.in_flight += 1
+                self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.in_flight)
+                self.stats['interactive' if priority == PRIORITY_INTERACTIVE else 'background'] += 1
+                session = await self.http.get_session()
+                async with session.get(url) as response:
+                    if response.status != 200:
+                        logger.error(f"Failed to download {url}: {response.status}")
+                        return None, self.retry_policy.should_retry_status(response.status), response.headers.get('Retry-After')
+                    data = await response.read()
+                    self.stats['downloads'] += 1
+                    self.stats['bytes'] += len(data)
+                    return data, False, None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Error downloading {url}: {e!r}")
+                return None, True, None
+            except Exception as e:
+                logger.error(f"Error downloading {url}: {e}")
+                return None, False, None
+            finally:
+                self.in_flight -= 1
+                self._global.release()
+        finally:
+            host_slot.release()
+
+    async def fetch_all(self, urls: List[str], priority: int = PRIORITY_BACKGROUND) -> List[Optional[bytes]]:
+        """Download URLs under the caps, returning results in input order"""
+        return await asyncio.gather(*(self.fetch(url, priority) for url in urls))
+
+    def get_stats(self) -> Dict:
+        """Get download counters and current queue depth"""
+        stats = dict(self.stats)
+        stats['in_flight'] = self.in_flight
+        stats['waiting'] = self._global.waiting + sum(slot.waiting for slot in self._hosts.values())
+        return stats
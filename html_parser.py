@@ -0,0 +1,74 @@
+import logging
+import time
+from typing import Dict, List, Optional
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+PURE_PYTHON_FEATURES = 'html.parser'
+
+def has_class(name: str) -> str:
+    """XPath predicate matching one class token, like a CSS .class selector"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def compile_xpath(expression: str):
+    """Precompile an XPath selector, or return None when lxml is unavailable"""
+    if not LXML_AVAILABLE:
+        return None
+    return etree.XPath(expression)
+
+class HtmlParser:
+    """Pluggable BeautifulSoup backend: lxml when installed, html.parser otherwise"""
+    def __init__(self, backend: str = 'auto'):
+        self.features = self._resolve_backend(backend)
+        self.stats = {'parses': 0, 'seconds': 0.0, 'bytes': 0}
+        logger.debug(f"HTML parser backend: {self.features}")
+
+    @staticmethod
+    def _resolve_backend(backend: str) -> str:
+        backend = (backend or 'auto').lower()
+        if backend in ('auto', 'lxml'):
+            if LXML_AVAILABLE:
+                return 'lxml'
+            if backend == 'lxml':
+                logger.warning("lxml requested but not installed, falling back to html.parser")
+            return PURE_PYTHON_FEATURES
+        return PURE_PYTHON_FEATURES
+
+    @property
+    def fast_path(self) -> bool:
+        """Whether precompiled XPath selectors can be used instead of a soup"""
+        return self.features == 'lxml'
+
+    def select(self, html: str, xpath) -> List:
+        """Run a precompiled XPath selector over the page with lxml directly"""
+        start = time.perf_counter()
+        document = lxml_html.document_fromstring(html)
+        elements = xpath(document)
+        self.stats['parses'] += 1
+        self.stats['seconds'] += time.perf_counter() - start
+        self.stats['bytes'] += len(html)
+        return elements
+
+    def parse(self, html: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+        """Parse HTML, keeping only the subtrees matched by parse_only when given"""
+        start = time.perf_counter()
+        soup = BeautifulSoup(html, self.features, parse_only=parse_only)
+        self.stats['parses'] += 1
+        self.stats['seconds'] += time.perf_counter() - start
+        self.stats['bytes'] += len(html)
+        return soup
+
+    def get_stats(self) -> Dict:
+        """Get parse counters for the active backend"""
+        stats = dict(self.stats)
+        stats['backend'] = self.features
+        stats['avg_ms'] = round(stats['seconds'] * 1000 / stats['parses'], 2) if stats['parses'] else 0.0
+        return stats
@@ -0,0 +1,81 @@
+from html.parser import HTMLParser
+from typing import List, Optional, Pattern, Sequence, Tuple
+
+class StreamTarget:
+    """An element a scraper needs to have read in full before a streamed download may stop"""
+    def __init__(self, tag: str, class_: Optional[str] = None, href: Optional[Pattern] = None):
+        self.tag = tag
+        self.class_ = class_
+        self.href = href
+
+    def matches(self, tag: str, attrs: dict) -> bool:
+        if tag != self.tag:
+            return False
+        if self.class_ and self.class_ not in (attrs.get('class') or '').split():
+            return False
+        if self.href is not None and not self.href.search(attrs.get('href') or ''):
+            return False
+        return True
+
+    def __repr__(self):
+        return f"StreamTarget({self.tag!r}, class_={self.class_!r})"
+
+class TargetWatcher(HTMLParser):
+    """Incremental tokenizer that reports when every declared target element has closed"""
+    def __init__(self, targets: Sequence[StreamTarget]):
+        super().__init__(convert_charrefs=False)
+        self.pending: List[StreamTarget] = list(targets)
+        # Open targets with the depth of same-named tags nested inside them
+        self.open_targets: List[list] = []
+        # (line, column) of the tag that completed the last target
+        self.done_at: Optional[Tuple[int, int]] = None
+
+    @property
+    def done(self) -> bool:
+        return not self.pending and not self.open_targets
+
+    def handle_starttag(self, tag, attrs):
+        for entry in self.open_targets:
+            if entry[0].tag == tag:
+                entry[1] += 1
+        attr_map = dict(attrs)
+        for target in list(self.pending):
+            if target.matches(tag, attr_map):
+                self.pending.remove(target)
+                self.open_targets.append([target, 1])
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing targets are complete as soon as they are seen
+        attr_map = dict(attrs)
+        for target in list(self.pending):
+            if target.matches(tag, attr_map):
+                self.pending.remove(target)
+                self._check_done()
+
+    def handle_endtag(self, tag):
+        for entry in list(self.open_targets):
+            if entry[0].tag == tag:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self.open_targets.remove(entry)
+                    self._check_done()
+
+    def _check_done(self):
+        if self.done and self.done_at is None:
+            # Handlers run before the parser moves past the tag, so this is where it starts
+            self.done_at = self.getpos()
+
+    def cut(self, text: str) -> str:
+        """Trim the text fed so far to end right after the tag that completed the targets
+
+        How far past it a streamed read got depends on chunk boundaries; the trimmed text
+        does not, so it can be hashed and compared between fetches.
+        """
+        if self.done_at is None:
+            return text
+        line, column = self.done_at
+        start = 0
+        for _ in range(line - 1):
+            start = text.index('\n', start) + 1
+        end = text.find('>', start + column)
+        return text if end < 0 else text[:end + 1]
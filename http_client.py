@@ -0,0 +1,102 @@
+import aiohttp
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+class HttpClient:
+    """Process-wide pooled aiohttp client shared by scrapers, search and the PDF builder"""
+    def __init__(self, limit: int = 64, limit_per_host: int = 8, keepalive_timeout: float = 60,
+                 dns_ttl: int = 300, total_timeout: float = 60, connect_timeout: float = 15,
+                 headers: Optional[Dict[str, str]] = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.total_timeout = total_timeout
+        self.connect_timeout = connect_timeout
+        self.headers = headers or dict(DEFAULT_HEADERS)
+        self.session = None
+        self.stats = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config) -> 'HttpClient':
+        """Build a client from the HTTP_* settings in Config"""
+        return cls(
+            limit=config.HTTP_LIMIT,
+            limit_per_host=config.HTTP_LIMIT_PER_HOST,
+            keepalive_timeout=config.HTTP_KEEPALIVE_SECONDS,
+            dns_ttl=config.HTTP_DNS_TTL_SECONDS,
+            total_timeout=config.HTTP_TIMEOUT_SECONDS,
+            connect_timeout=config.HTTP_CONNECT_TIMEOUT_SECONDS,
+        )
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        """Count requests, new connections and pooled connection reuse"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            self.stats['requests'] += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            self.stats['connections_created'] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.stats['connections_reused'] += 1
+
+        async def on_dns_cache_hit(session, ctx, params):
+            self.stats['dns_cache_hits'] += 1
+
+        async def on_dns_cache_miss(session, ctx, params):
+            self.stats['dns_cache_misses'] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get or create the shared session"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_ttl,
+                use_dns_cache=True,
+            )
+            timeout = aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=timeout,
+                trace_configs=[self._build_trace_config()],
+            )
+            logger.info(f"Created pooled HTTP session (limit={self.limit}, per_host={self.limit_per_host})")
+        return self.session
+
+    async def close(self):
+        """Close the shared session and its connection pool"""
+        if self.session:
+            await self.session.close()
+            self.session = None
+            logger.info(f"Closed pooled HTTP session: {self.get_stats()}")
+
+    def get_stats(self) -> Dict:
+        """Get request and connection reuse counters"""
+        stats = dict(self.stats)
+        acquired = stats['connections_created'] + stats['connections_reused']
+        stats['reuse_ratio'] = round(stats['connections_reused'] / acquired, 3) if acquired else 0.0
+        return stats
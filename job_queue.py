@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """A claimed job; handlers may checkpoint progress into its payload"""
+    def __init__(self, queue: 'JobQueue', id: int, kind: str, payload: Dict, attempts: int, max_attempts: int):
+        self.queue = queue
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+
+    @property
+    def last_attempt(self) -> bool:
+        return self.attempts >= self.max_attempts
+
+    def checkpoint(self, **updates):
+        """Persist payload changes so a resumed job continues from here"""
+        self.payload.update(updates)
+        self.queue.db.update_job_payload(self.id, json.dumps(self.payload))
+
+class JobQueue:
+    """Worker pool consuming the durable jobs table: queued -> running (leased) -> done or failed"""
+    def __init__(self, db, workers: int = 2, lease_seconds: float = 600, max_attempts: int = 5,
+                 retry_base_seconds: float = 30, poll_seconds: float = 5):
+        self.db = db
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_seconds = poll_seconds
+        self.handlers: Dict[str, Callable[[Job], Awaitable]] = {}
+        self._wakeup = asyncio.Event()
+        self.stats = {'enqueued': 0, 'completed': 0, 'retried': 0, 'failed': 0}
+
+    @classmethod
+    def from_config(cls, db, config) -> 'JobQueue':
+        """Build a queue from the JOB_* settings in Config"""
+        return cls(
+            db,
+            workers=config.JOB_WORKERS,
+            lease_seconds=config.JOB_LEASE_SECONDS,
+            max_attempts=config.JOB_MAX_ATTEMPTS,
+            retry_base_seconds=config.JOB_RETRY_BASE_SECONDS,
+            poll_seconds=config.JOB_POLL_SECONDS,
+        )
+
+    def register(self, kind: str, handler: Callable[[Job], Awaitable]):
+        """Register the coroutine that runs jobs of a kind"""
+        self.handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: Dict, priority: int = 0,
+                ordering_key: Optional[str] = None, dedupe_key: Optional[str] = None) -> Optional[int]:
+        """Persist a job and wake a worker.
+
+        Jobs sharing an ordering_key run one at a time in enqueue order. A job whose
+        dedupe_key matches an unfinished job is dropped and None is returned.
+        """
+        job_id = self.db.enqueue_job(kind, json.dumps(payload), priority, self.max_attempts, ordering_key, dedupe_key)
+        if job_id is None:
+            logger.info(f"Skipped duplicate {kind} job {dedupe_key}")
+            return None
+        self.stats['enqueued'] += 1
+        self._wakeup.set()
+        return job_id
+
+    async def run(self):
+        """Run the worker pool forever; cancel the task to stop"""
+        # Only one bot instance runs at a time, so anything still marked running was interrupted
+        resumed = self.db.release_job_leases()
+        if resumed:
+            logger.info(f"Resuming {resumed} interrupted jobs")
+        logger.info(f"Job queue started with {self.workers} workers")
+        await asyncio.gather(*(self._worker(index) for index in range(self.workers)))
+
+    async def _worker(self, index: int):
+        while True:
+            # Clear before claiming so an enqueue racing with an empty claim still wakes us
+            self._wakeup.clear()
+            row = self.db.claim_job(self.lease_seconds)
+            if row is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job_id, kind, payload, attempts, max_attempts = row
+            job = Job(self, job_id, kind, json.loads(payload), attempts, max_attempts)
+            await self._run_job(job)
+
+    async def _run_job(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            logger.error(f"No handler for job kind {job.kind}")
+            self.db.fail_job(job.id, f"No handler for {job.kind}", None)
+            self.stats['failed'] += 1
+            return
+        heartbeat = asyncio.create_task(self._keep_lease(job.id))
+        try:
+            await handler(job)
+            self.db.complete_job(job.id)
+            self.stats['completed'] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if job.last_attempt:
+                logger.error(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempts: {e}")
+                self.db.fail_job(job.id, str(e), None)
+                self.stats['failed'] += 1
+            else:
+                delay = random.uniform(0.5, 1.0) * self.retry_base_seconds * (2 ** (job.attempts - 1))
+                logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, retrying in {delay:.0f}s: {e}")
+                self.db.fail_job(job.id, str(e), delay)
+                self.stats['retried'] += 1
+        finally:
+            heartbeat.cancel()
+        self._wakeup.set()
+
+    async def _keep_lease(self, job_id: int):
+        """Extend a running job's lease so long chapter ranges are not reclaimed"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            self.db.extend_job_lease(job_id, self.lease_seconds)
+
+    def get_stats(self) -> Dict:
+        """Get worker counters and job counts per state"""
+        stats = dict(self.stats)
+        stats['states'] = self.db.get_job_counts()
+        stats['workers'] = self.workers
+        return stats
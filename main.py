@@ -2,22 +2,28 @@ import asyncio
 import logging
 import os
 import sys
-import aiohttp
 from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.enums import UpdateType
+from aiogram.exceptions import TelegramBadRequest
 from typing import Optional, Set, List
 from config import Config
-from database import ManhwaDB
+from database import ManhwaDB, telegram_part_key
 from pdf_processor import PDFProcessor
 from user_manager import UserManager
 from scraper import ManhwaScraperManager
+from base_scraper import normalize_chapter_number
+from download_scheduler import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from update_sweep import UpdateSweep
+from poll_scheduler import PollScheduler
+from job_queue import JobQueue
+from telegram_limiter import TelegramRateLimiter
+from pipeline import Pipeline
+import rendering
+from watermark import SUBTLE_STYLE
+from render_profiles import OUTPUT_FORMATS, PROFILES, RenderProfile, find_profile
 import aiofiles
-from PIL import Image, ImageDraw, ImageFont
-import io
-import img2pdf
-from PyPDF2 import PdfReader, PdfWriter
 import atexit
 import signal
 
@@ -65,23 +71,30 @@ def remove_lock():
     except:
         pass
 
-# Register cleanup handlers
-atexit.register(remove_lock)
-signal.signal(signal.SIGINT, lambda s, f: (remove_lock(), sys.exit(0)))
-signal.signal(signal.SIGTERM, lambda s, f: (remove_lock(), sys.exit(0)))
-
 class ManhwaBot:
     def __init__(self, config):
         """Initialize the bot"""
         self.config = config
         self.config.validate()
         self.bot = Bot(token=self.config.BOT_TOKEN)
+        # Every outgoing call is paced and retried on flood limits
+        self.rate_limiter = TelegramRateLimiter.from_config(self.config)
+        self.bot.session.middleware(self.rate_limiter)
         self.dp = Dispatcher()
         self.db = ManhwaDB(self.config.DATABASE_PATH)
-        self.scraper = ManhwaScraperManager()  # Use ManhwaScraperManager
+        self.scraper = ManhwaScraperManager(self.config, self.db)  # Owns the pooled HTTP client
         self.user_manager = UserManager({5042428876, 7961509388})
         self.user_states = {}  # Initialize user states dictionary
-        self.pdf_processor = PDFProcessor()
+        self.pdf_processor = PDFProcessor(self.scraper.http, self.scraper.downloads)
+        self.sweep = UpdateSweep.from_config(self.scraper, self.deliver_series_updates, self.config)
+        self.last_sweep = None
+        self.sweep_lock = asyncio.Lock()  # Scheduled and manual sweeps never overlap
+        self.poller = PollScheduler.from_config(self.db, self.check_for_updates, self.config)
+        # Chapter builds and deliveries run from the durable job queue, not inside handlers
+        self.jobs = JobQueue.from_config(self.db, self.config)
+        self.jobs.register('deliver_chapter', self.run_deliver_chapter_job)
+        self.jobs.register('deliver_range', self.run_deliver_range_job)
+        self.delivery_stats = {'uploads': 0, 'file_id_sends': 0, 'stale_file_ids': 0}
         
         # Register command handlers
         self.register_handlers()
@@ -100,6 +113,10 @@ class ManhwaBot:
         self.dp.message.register(self.cmd_remove_user, Command("removeuser"))
         self.dp.message.register(self.cmd_list_users, Command("listusers"))
         self.dp.message.register(self.cmd_search, Command("search"))
+        self.dp.message.register(self.cmd_stats, Command("stats"))
+        self.dp.message.register(self.cmd_cache, Command("cache"))
+        self.dp.message.register(self.cmd_profile, Command("profile"))
+        self.dp.message.register(self.cmd_format, Command("format"))
         
         # Register callback query handler
         self.dp.callback_query.register(self.handle_callback_query)
@@ -142,7 +159,7 @@ class ManhwaBot:
                     "1. Use /search <manhwa_name> to search for manhwa\n"
                     "2. Or use /fetch <manhwa_url> to start with a URL\n"
                     "3. Select the chapters you want\n"
-                    "4. I'll send you the chapters as PDFs\n\n"
+                    "4. I'll send you the chapters as PDFs (or CBZ, see /format)\n\n"
                     "Example:\n"
                     "/search solo leveling\n"
                     "or\n"
@@ -165,13 +182,19 @@ class ManhwaBot:
         if not await self.check_authorization(message):
             return
 
-        # Get URL from message
-        args = message.text.split(' ', 1)
+        # Get URL and optional render profile from message
+        args = message.text.split()
         if len(args) < 2:
-            await message.reply("Please provide a URL. Usage: /fetch <url>")
+            await message.reply("Please provide a URL. Usage: /fetch <url> [profile]")
             return
             
         url = args[1].strip()
+        profile = None
+        if len(args) > 2:
+            profile = find_profile(args[2])
+            if not profile:
+                await message.reply(f"Unknown profile '{args[2]}'. Choose one of: {', '.join(PROFILES)}")
+                return
 
         # Send initial message
         status_msg = await message.reply("Fetching chapters...")
@@ -183,9 +206,8 @@ class ManhwaBot:
                 await status_msg.edit_text("Unsupported site. Currently only ManhwaClan is supported.")
                 return
 
-            # Create session and get chapters
-            session = await self.scraper.get_session()
-            chapters = await scraper.get_latest_chapters(session, url)
+            # Get chapters (cached briefly so search, /fetch and /latest share one scrape)
+            chapters = await self.scraper.get_latest_chapters(url)
             
             if not chapters:
                 await status_msg.edit_text("No chapters found or error occurred.")
@@ -195,7 +217,8 @@ class ManhwaBot:
             self.user_states[message.from_user.id] = {
                 'state': 'fetching',
                 'chapters': chapters,
-                'url': url
+                'url': url,
+                'profile': profile.name if profile else None
             }
 
             # Format chapter list
@@ -258,42 +281,12 @@ class ManhwaBot:
                 await message.reply("No valid chapters selected.")
                 return
 
-            # Process selected chapters
-            status_msg = await message.reply(f"Processing {len(selected_chapters)} chapters...")
-            
-            # Get scraper for processing
-            scraper = self.scraper.get_scraper(url)
-            session = await self.scraper.get_session()
-            
-            for chapter in selected_chapters:
-                try:
-                    # Get chapter images
-                    images = await scraper.get_chapter_images(session, chapter['url'])
-                    if not images:
-                        continue
-
-                    # Create PDF
-                    pdf_path = await self.pdf_processor.create_chapter_pdf(
-                        images,
-                        chapter['name'],
-                        url
-                    )
-
-                    if pdf_path:
-                        # Send PDF
-                        with open(pdf_path, 'rb') as pdf_file:
-                            await message.answer_document(
-                                document=types.FSInputFile(pdf_path),
-                                caption=f"Chapter: {chapter['name']}"
-                            )
-                        # Clean up PDF file
-                        os.remove(pdf_path)
-
-                except Exception as e:
-                    logger.error(f"Error processing chapter {chapter['name']}: {e}")
-                    await message.reply(f"Error processing chapter {chapter['name']}: {str(e)}")
-
-            await status_msg.edit_text("All chapters processed!")
+            # Queue selected chapters
+            status_msg = await message.reply(f"Queued {len(selected_chapters)} chapters...")
+            self.enqueue_chapter_range(
+                url, None, selected_chapters, message.chat.id, status_msg, PRIORITY_INTERACTIVE,
+                profile=self.user_profile(user_id, user_state.get('profile'))
+            )
 
         except Exception as e:
             logger.error(f"Error in chapter range handler: {e}")
@@ -323,7 +316,7 @@ class ManhwaBot:
 
             result = await self.scraper.add_manhwa(url)
             if result["success"]:
-                self.db.add_manhwa(
+                added = self.db.add_manhwa(
                     name=result["name"],
                     url=url,
                     site_name=result["site"],
@@ -331,7 +324,10 @@ class ManhwaBot:
                     last_chapter_url=result.get("latest_chapter_url", ""),
                     last_chapter_name=result.get("latest_chapter", "")
                 )
-                await message.answer(f"✅ Added: {result['name']}")
+                if added:
+                    await message.answer(f"✅ Added: {result['name']}")
+                else:
+                    await message.answer(f"📚 You are already tracking {result['name']}")
             else:
                 await message.answer(f"❌ Failed to add manhwa: {result['error']}")
         except Exception as e:
@@ -341,8 +337,7 @@ class ManhwaBot:
     async def cmd_list_manhwa(self, message: Message):
         """List tracked manhwa for the current user"""
         user_id = message.from_user.id
-        # Filter manhwa by user_id
-        manhwa_list = [m for m in self.db.get_all_manhwa() if m.telegram_user_id == user_id]
+        manhwa_list = self.db.get_user_manhwa(user_id)
 
         if not manhwa_list:
             await message.answer("No manhwa being tracked by you.")
@@ -364,15 +359,11 @@ class ManhwaBot:
             name = args[1]
             user_id = message.from_user.id
 
-            # Ensure only the user who added it can remove it (or an admin)
-            manhwa_to_remove = self.db.get_manhwa_by_name(name)
-            if manhwa_to_remove and manhwa_to_remove.telegram_user_id == user_id:
-                if self.db.remove_manhwa(name):
-                    await message.answer(f"✅ Removed: {name}")
-                else:
-                    await message.answer(f"❌ Manhwa not found: {name}")
+            # Only the user's own subscription is removed; other subscribers keep the series
+            if self.db.remove_manhwa(name, user_id):
+                await message.answer(f"✅ Removed: {name}")
             else:
-                await message.answer(f"❌ You can only remove manhwa you have added.")
+                await message.answer(f"❌ Manhwa not found in your tracking list: {name}")
 
         except Exception as e:
             logger.error(f"Error removing manhwa: {e}")
@@ -384,38 +375,217 @@ class ManhwaBot:
         try:
             updates = await self.check_for_updates()
             if updates:
-                await message.answer(f"✅ Found {len(updates)} new chapters!")
+                await message.answer(f"✅ Found {len(updates)} new chapters!\n\n{self.last_sweep.summary()}")
             else:
-                await message.answer("📚 No new chapters found.")
+                await message.answer(f"📚 No new chapters found.\n\n{self.last_sweep.summary()}")
         except Exception as e:
             logger.error(f"Error in manual check: {e}")
             await message.answer("❌ Error checking for updates")
 
     async def cmd_status(self, message: Message):
         """Show bot status"""
-        manhwa_count = len(self.db.get_all_manhwa())
+        manhwa_count = len(self.db.get_all_series())
         status_text = f"""
         📊 **Bot Status**
         Tracked Manhwa: {manhwa_count}
-        Auto-check: Every {self.config.UPDATE_INTERVAL_HOURS} hours
+        Auto-check: Adaptive, every {self.config.POLL_MIN_INTERVAL_HOURS:g}-{self.config.POLL_MAX_INTERVAL_HOURS:g} hours (default {self.config.UPDATE_INTERVAL_HOURS:g})
+        Next check: {self.db.get_next_check_at() or 'Now'} UTC
         Status: Running ✅
         """
         await message.answer(status_text, parse_mode="Markdown")
 
+    async def cmd_stats(self, message: Message):
+        """Show performance counters (admin only)"""
+        if not self.user_manager.is_admin(message.from_user.id):
+            await message.answer("You are not authorized to view stats.")
+            return
+
+        http_stats = self.scraper.http.get_stats()
+        download_stats = self.scraper.downloads.get_stats()
+        conditional_stats = self.scraper.conditional_cache.get_stats()
+        parser_stats = self.scraper.html_parser.get_stats()
+        scrape_flights = self.scraper.flights.get_stats()
+        stream_stats = self.scraper.get_stream_stats()
+        build_flights = self.pdf_processor.build_flights.get_stats()
+        artifact_stats = self.pdf_processor.artifacts.get_stats()
+        limiter_stats = self.rate_limiter.get_stats()
+        render_stats = self.pdf_processor.render_pool.get_stats()
+        build_stats = self.pdf_processor.build_stats
+        profile_lines = "".join(
+            f"  {name}: {stats['builds']} builds, avg {stats['bytes'] / stats['builds'] / 1048576:.1f} MB "
+            f"in {stats['seconds'] / stats['builds']:.1f}s ({stats['pages']} pages)\n"
+            for name, stats in self.pdf_processor.profile_stats.items() if stats['builds']
+        )
+        poll_stats = self.poller.get_stats()
+        job_stats = self.jobs.get_stats()
+        stats_text = (
+            "📈 Stats\n\n"
+            "HTTP pool:\n"
+            f"  Requests: {http_stats['requests']}\n"
+            f"  Connections created: {http_stats['connections_created']}\n"
+            f"  Connections reused: {http_stats['connections_reused']}\n"
+            f"  Reuse ratio: {http_stats['reuse_ratio']:.1%}\n"
+            f"  DNS cache hits/misses: {http_stats['dns_cache_hits']}/{http_stats['dns_cache_misses']}\n"
+            "\nImage downloads:\n"
+            f"  Completed: {download_stats['downloads']} ({download_stats['bytes'] / 1048576:.1f} MB)\n"
+            f"  Failed: {download_stats['failures']} (retries: {download_stats['retries']})\n"
+            f"  Interactive/background: {download_stats['interactive']}/{download_stats['background']}\n"
+            f"  In flight: {download_stats['in_flight']} (peak {download_stats['peak_in_flight']}), waiting: {download_stats['waiting']}\n"
+            "\nSeries page cache:\n"
+            f"  Conditional requests: {conditional_stats['requests']}\n"
+            f"  Hits: {conditional_stats['hits']} (304: {conditional_stats['not_modified_304']}, same body: {conditional_stats['unchanged_body']})\n"
+            f"  Misses: {conditional_stats['misses']}\n"
+            "\nStreamed page fetches:\n"
+            f"  Streamed: {stream_stats['streamed']}, stopped early: {stream_stats['early_stops']}\n"
+            f"  Read: {stream_stats['bytes_read'] / 1048576:.1f} MB, skipped: {stream_stats['bytes_skipped'] / 1048576:.1f} MB\n"
+            f"\nHTML parsing ({parser_stats['backend']}):\n"
+            f"  Pages: {parser_stats['parses']} ({parser_stats['bytes'] / 1048576:.1f} MB), avg {parser_stats['avg_ms']} ms\n"
+            f"\nRendering ({render_stats['workers']} {render_stats['mode']}, default profile {self.pdf_processor.default_profile.name}):\n"
+            f"  Tasks: {render_stats['tasks']}, avg {render_stats['avg_ms']} ms, "
+            f"failures: {render_stats['failures']}, pool restarts: {render_stats['restarts']}\n"
+            f"  Chapter files: {build_stats['builds']} ({build_stats['pages']} pages), peak page data "
+            f"{build_stats['last_peak_bytes'] / 1048576:.1f} MB last, {build_stats['peak_bytes'] / 1048576:.1f} MB max\n"
+            f"{profile_lines}"
+            "\nCoalesced duplicate work:\n"
+            f"  Scrapes: {scrape_flights['coalesced']} of {scrape_flights['calls']} calls\n"
+            f"  PDF builds: {build_flights['coalesced']} of {build_flights['calls']} calls\n"
+            "\nTelegram deliveries:\n"
+            f"  Uploads: {self.delivery_stats['uploads']}, resent by file_id: {self.delivery_stats['file_id_sends']}, "
+            f"stale ids: {self.delivery_stats['stale_file_ids']}\n"
+            f"  Paced calls: {limiter_stats['calls']}, delayed: {limiter_stats['delayed']} "
+            f"({limiter_stats['wait_seconds']:.1f}s), flood waits: {limiter_stats['retry_after']}, gave up: {limiter_stats['gave_up']}\n"
+            "\nChapter file cache:\n"
+            f"  Files: {artifact_stats['entries']} ({artifact_stats['bytes'] / 1048576:.1f} of "
+            f"{artifact_stats['max_bytes'] / 1048576:.0f} MB), in use: {artifact_stats['pinned']}\n"
+            f"  Hits: {artifact_stats['hits']}, misses: {artifact_stats['misses']} ({artifact_stats['hit_ratio']:.1%} hit ratio), "
+            f"evicted: {artifact_stats['evictions']}\n"
+            "\nScheduled update checks:\n"
+            f"  Sweeps: {poll_stats['sweeps']}, series checked: {poll_stats['series_checked']}, errors: {poll_stats['errors']}\n"
+            f"  Next check: {poll_stats['next_check_at'] or 'now'} UTC\n"
+            f"\nJob queue ({job_stats['workers']} workers):\n"
+            f"  Queued: {job_stats['states'].get('queued', 0)}, running: {job_stats['states'].get('running', 0)}, "
+            f"failed: {job_stats['states'].get('failed', 0)}\n"
+            f"  Completed: {job_stats['completed']}, retried: {job_stats['retried']}\n"
+            "\nSite circuits:\n"
+        )
+        for domain, breaker in self.scraper.circuit_breakers.items():
+            breaker_stats = breaker.get_stats()
+            stats_text += (
+                f"  {domain}: {breaker_stats['state']} "
+                f"(opened {breaker_stats['opened']}x, rejected {breaker_stats['rejected']})\n"
+            )
+        await message.answer(stats_text)
+
+    async def cmd_cache(self, message: Message):
+        """View or flush the scrape cache (admin only)"""
+        if not self.user_manager.is_admin(message.from_user.id):
+            await message.answer("You are not authorized to manage the cache.")
+            return
+
+        args = message.text.split()
+        if len(args) >= 2 and args[1].lower() == 'flush':
+            kind = args[2].lower() if len(args) >= 3 else None
+            if kind == 'files':
+                removed = self.pdf_processor.artifacts.clear()
+                await message.answer(f"🧹 Deleted {removed} cached chapter files.")
+                return
+            if kind and kind not in self.scraper.cache.ttls:
+                await message.answer(f"Unknown cache kind. Use one of: {', '.join(self.scraper.cache.ttls)}, files")
+                return
+            removed = self.scraper.cache.clear(kind)
+            await message.answer(f"🧹 Flushed {removed} cache entries.")
+            return
+
+        cache_stats = self.scraper.cache.get_stats()
+        per_kind = "\n".join(
+            f"  {kind}: {cache_stats['per_kind'].get(kind, 0)} (TTL {int(ttl)}s)"
+            for kind, ttl in self.scraper.cache.ttls.items()
+        )
+        await message.answer(
+            "🗄 Scrape cache\n\n"
+            f"Entries: {cache_stats['entries']}/{cache_stats['max_entries']}\n"
+            f"{per_kind}\n"
+            f"Hits: {cache_stats['hits']}, misses: {cache_stats['misses']} ({cache_stats['hit_ratio']:.1%} hit ratio)\n"
+            f"Expired: {cache_stats['expired']}, evicted: {cache_stats['evictions']}\n\n"
+            "Usage: /cache flush [chapters|images|info|files]"
+        )
+
+    async def cmd_profile(self, message: Message):
+        """Show or set the render profile chapters are built with"""
+        if not await self.check_authorization(message):
+            return
+
+        user_id = message.from_user.id
+        args = message.text.split()
+        if len(args) < 2:
+            current = self.user_profile(user_id)
+            lines = [f"{'✅' if name == current.name else '▫️'} {name}: {profile.description}"
+                     for name, profile in PROFILES.items()]
+            await message.answer(
+                "🖼 Render profiles\n\n" + "\n".join(lines) +
+                "\n\nUsage: /profile <name>\nA profile name after /fetch <url> or /latest <manhwa> [range] applies to that request only."
+            )
+            return
+
+        profile = find_profile(args[1])
+        if not profile:
+            await message.answer(f"❌ Unknown profile '{args[1]}'. Choose one of: {', '.join(PROFILES)}")
+            return
+        if self.db.set_user_render_profile(user_id, profile.name):
+            await message.answer(f"✅ Chapters will be sent with the {profile.name} profile ({profile.description})")
+        else:
+            await message.answer("❌ Failed to save your profile. Please try again.")
+
+    async def cmd_format(self, message: Message):
+        """Show or set the file format chapters are sent as"""
+        if not await self.check_authorization(message):
+            return
+
+        user_id = message.from_user.id
+        args = message.text.split()
+        if len(args) < 2:
+            current = self.user_profile(user_id).output_format
+            await message.answer(
+                f"📦 Chapters are sent as {current.upper()}\n\n"
+                "Usage: /format <pdf|cbz>\n"
+                "CBZ keeps the original images (only the first page is watermarked) and opens in comic reader apps."
+            )
+            return
+
+        output_format = args[1].lower()
+        if output_format not in OUTPUT_FORMATS:
+            await message.answer(f"❌ Unknown format '{args[1]}'. Choose one of: {', '.join(OUTPUT_FORMATS)}")
+            return
+        if self.db.set_user_output_format(user_id, output_format):
+            await message.answer(f"✅ Chapters will be sent as {output_format.upper()}")
+        else:
+            await message.answer("❌ Failed to save your format. Please try again.")
+
+    def user_profile(self, user_id: int, override: Optional[str] = None) -> RenderProfile:
+        """Render profile for a request: the one named in the command, else the user's, else the default,
+        set to the user's file format"""
+        return self.pdf_processor.get_profile(
+            override or self.db.get_user_render_profile(user_id), self.db.get_user_output_format(user_id)
+        )
+
     async def cmd_get_latest(self, message: Message):
         """Get chapters of a specific manhwa"""
         try:
-            args = message.text.split(maxsplit=2)
-            if len(args) < 2:
-                await message.answer("Usage: /latest <manhwa_name> [chapter_range]\nExamples:\n/latest manhwa_name\n/latest manhwa_name latest\n/latest manhwa_name 1-5")
+            args = message.text.split()
+            # A trailing profile name picks the render profile for this request only
+            profile = find_profile(args[-1]) if len(args) > 2 else None
+            if profile:
+                args.pop()
+            if len(args) < 2 or len(args) > 3:
+                await message.answer("Usage: /latest <manhwa_name> [chapter_range] [profile]\nExamples:\n/latest manhwa_name\n/latest manhwa_name latest\n/latest manhwa_name 1-5\n/latest manhwa_name 1-5 mobile")
                 return
 
             manhwa_name = args[1]
             user_id = message.from_user.id
 
             # Get manhwa from database
-            manhwa = self.db.get_manhwa_by_name(manhwa_name)
-            if not manhwa or manhwa.telegram_user_id != user_id:
+            manhwa = self.db.get_manhwa_by_name(manhwa_name, user_id)
+            if not manhwa:
                 await message.answer(f"❌ Manhwa '{manhwa_name}' not found in your tracking list.")
                 return
 
@@ -423,14 +593,13 @@ class ManhwaBot:
             processing_msg = await message.answer(f"🔄 Getting chapters for {manhwa_name}...")
 
             # Get chapter info
-            session = await self.scraper.get_session()
             scraper = self.scraper.get_scraper(manhwa.url)
             if not scraper:
                 await processing_msg.edit_text(f"❌ Unsupported site for {manhwa_name}")
                 return
 
-            info = await scraper.get_manhwa_info(session, manhwa.url)
-            if not info or not info.get('chapters'):
+            chapters = await self.scraper.get_latest_chapters(manhwa.url)
+            if not chapters:
                 await processing_msg.edit_text(f"❌ Could not get chapter info for {manhwa_name}")
                 return
 
@@ -438,7 +607,7 @@ class ManhwaBot:
             chapters_to_process = []
             if len(args) == 2 or args[2].lower() == 'latest':
                 # Get only the latest chapter
-                latest_chapter = info['chapters'][-1]
+                latest_chapter = chapters[-1]
                 chapters_to_process = [latest_chapter]
                 await processing_msg.edit_text(f"🔄 Processing latest chapter ({latest_chapter['name']})...")
             else:
@@ -449,7 +618,7 @@ class ManhwaBot:
                         start, end = map(int, range_str.split('-'))
                         # Filter chapters within range
                         chapters_to_process = [
-                            ch for ch in info['chapters']
+                            ch for ch in chapters
                             if start <= int(ch['name'].split()[-1]) <= end
                         ]
                         if not chapters_to_process:
@@ -460,7 +629,7 @@ class ManhwaBot:
                         # Single chapter
                         chapter_num = int(range_str)
                         chapter = next(
-                            (ch for ch in info['chapters'] if int(ch['name'].split()[-1]) == chapter_num),
+                            (ch for ch in chapters if int(ch['name'].split()[-1]) == chapter_num),
                             None
                         )
                         if not chapter:
@@ -472,101 +641,405 @@ class ManhwaBot:
                     await processing_msg.edit_text("❌ Invalid chapter range format. Use numbers like '1-5' or 'latest'")
                     return
 
-            # Process and send chapters
-            success_count = 0
-            for chapter in chapters_to_process:
-                try:
-                    success = await self.process_and_deliver_chapter(manhwa, chapter, user_id)
-                    if success:
-                        success_count += 1
-                        # Add a small delay between chapters to avoid rate limits
-                        await asyncio.sleep(2)
-                except Exception as e:
-                    logger.error(f"Error processing chapter {chapter['name']}: {e}")
-                    continue
-
-            if success_count > 0:
-                await processing_msg.edit_text(f"✅ Successfully sent {success_count} chapter(s) to your DM!")
-                # Update database with latest chapter info
-                if len(args) == 2 or args[2].lower() == 'latest':
-                    self.db.update_manhwa_progress(
-                        manhwa.name,
-                        chapters_to_process[-1]['url'],
-                        chapters_to_process[-1]['name']
-                    )
-            else:
-                await processing_msg.edit_text(f"❌ Failed to process any chapters")
+            # Queue chapters; the latest chapter also advances the user's progress
+            track_progress = len(args) == 2 or args[2].lower() == 'latest'
+            self.enqueue_chapter_range(
+                manhwa.url, manhwa.name, chapters_to_process, user_id, processing_msg, PRIORITY_INTERACTIVE,
+                progress={'series_id': manhwa.series_id, 'user_id': user_id} if track_progress else None,
+                profile=self.user_profile(user_id, profile.name if profile else None)
+            )
 
         except Exception as e:
             logger.error(f"Error getting chapters: {e}")
             await message.answer("❌ Error getting chapters. Please try again.")
 
-    async def check_for_updates(self):
-        """Check all manhwa for new chapters"""
+    async def check_for_updates(self, series_list=None):
+        """Check tracked series for new chapters, all of them unless a list is given"""
+        async with self.sweep_lock:
+            if series_list is None:
+                series_list = self.db.get_all_series()
+            self.last_sweep = await self.sweep.run(series_list)
+            self.poller.reschedule(series_list)
+            return self.last_sweep.updates
+
+    async def deliver_series_updates(self, series, new_chapters):
+        """Queue one delivery job per new chapter, built once for every subscriber who lacks it"""
         updates = []
-        manhwa_list = self.db.get_all_manhwa()
-        for manhwa in manhwa_list:
+        try:
+            for chapter in new_chapters:
+                # Subscribers who already fetched this chapter themselves are skipped
+                recipients = [
+                    user_id for user_id, progress in series.subscribers.items()
+                    if not self.has_received(progress, chapter)
+                ]
+                if not recipients:
+                    self.db.update_series_progress(series.id, chapter['url'], chapter['name'])
+                    self.scraper.mark_chapters_known(series.url, [chapter])
+                    continue
+                job_id = self.jobs.enqueue(
+                    'deliver_chapter',
+                    {
+                        'series_id': series.id,
+                        'series_url': series.url,
+                        'series_name': series.name,
+                        'chapter': {'name': chapter['name'], 'url': chapter['url'], 'number': chapter.get('number')},
+                        'recipients': recipients,
+                        'priority': PRIORITY_BACKGROUND,
+                    },
+                    priority=PRIORITY_BACKGROUND,
+                    ordering_key=series.url,
+                    dedupe_key=f"deliver:{series.url}:{chapter['url']}",
+                )
+                if job_id is not None:
+                    updates.append((series.name, chapter['name']))
+        except Exception as e:
+            logger.error(f"Error queueing updates for {series.name}: {e}")
+            self.scraper.forget_validators(series.url)
+        return updates
+
+    @staticmethod
+    def has_received(progress, chapter) -> bool:
+        """Check whether a subscriber's progress already covers a chapter"""
+        last_chapter_url, last_chapter_name = progress
+        if last_chapter_url and last_chapter_url == chapter['url']:
+            return True
+        last_number = normalize_chapter_number(last_chapter_name, last_chapter_url)
+        number = chapter.get('number')
+        return last_number is not None and number is not None and number <= last_number
+
+    def enqueue_chapter_range(self, series_url: str, series_name: Optional[str], chapters, chat_id: int,
+                              status_msg: Message, priority: int, progress=None,
+                              profile: Optional[RenderProfile] = None):
+        """Queue chapters for one chat, reporting progress by editing status_msg"""
+        self.jobs.enqueue(
+            'deliver_range',
+            {
+                'series_url': series_url,
+                'series_name': series_name,
+                'chapters': [{'name': chapter['name'], 'url': chapter['url']} for chapter in chapters],
+                'chat_id': chat_id,
+                'status': [status_msg.chat.id, status_msg.message_id],
+                'progress': progress,
+                'priority': priority,
+                'profile': profile.name if profile else None,
+                'format': profile.output_format if profile else None,
+                'next_index': 0,
+                'sent': 0,
+                'failed': [],
+            },
+            priority=priority,
+            ordering_key=f"chat:{chat_id}",
+        )
+
+    async def run_deliver_chapter_job(self, job):
+        """Job: deliver a newly released chapter to the subscribers still waiting for it"""
+        payload = job.payload
+        chapter = payload['chapter']
+        # Subscribers sharing an output channel get one copy
+        chats = {}
+        for user_id in payload['recipients']:
+            chats.setdefault(self.db.get_user_output_channel(user_id) or user_id, []).append(user_id)
+
+        # Each chat gets the chapter in the render profile of the first subscriber it serves
+        by_profile = {}
+        for chat_id, user_ids in chats.items():
+            by_profile.setdefault(self.user_profile(user_ids[0]), []).append(chat_id)
+        delivered = []
+        for profile, chat_ids in by_profile.items():
+            delivered += await self.deliver_chapter(
+                payload['series_url'], payload['series_name'], chapter, chat_ids, payload['priority'], profile
+            )
+        for chat_id in delivered:
+            for user_id in chats[chat_id]:
+                self.db.update_manhwa_progress(payload['series_id'], user_id, chapter['url'], chapter['name'])
+
+        remaining = [user_id for chat_id, user_ids in chats.items() if chat_id not in delivered for user_id in user_ids]
+        if remaining:
+            job.checkpoint(recipients=remaining)
+            # Re-read the series page next time instead of trusting the cache
+            self.scraper.forget_validators(payload['series_url'])
+            raise RuntimeError(f"{chapter['name']} not delivered to {len(remaining)} subscribers")
+
+        # Update database
+        self.db.update_series_progress(payload['series_id'], chapter['url'], chapter['name'])
+        self.scraper.mark_chapters_known(payload['series_url'], [chapter])
+
+    async def run_deliver_range_job(self, job):
+        """Job: deliver chapters requested through /fetch or /latest, resuming after the last one sent
+
+        Chapters flow through a scrape -> download -> render -> upload pipeline, so the next
+        chapter's first pages download while this one renders and the previous one uploads.
+        The render stage streams the remaining pages through the page window.
+        """
+        payload = job.payload
+        chapters = payload['chapters']
+        series_url = payload['series_url']
+        series_name = payload['series_name']
+        priority = payload['priority']
+        profile = self.pdf_processor.get_profile(payload.get('profile'), payload.get('format'))
+        items = [{'index': index, 'chapter': chapters[index]} for index in range(payload['next_index'], len(chapters))]
+
+        async def scrape(item):
+            chapter = item['chapter']
+            if self.db.get_telegram_file_ids(self.pdf_processor.chapter_key(chapter['url'], profile)):
+                # Telegram already has it; the upload stage resends it by file_id
+                item['by_file_id'] = True
+                return
+            item['pdf_paths'] = self.pdf_processor.get_cached_pdf(chapter['url'], profile)
+            if item['pdf_paths']:
+                return
+            if not self.scraper.get_scraper(series_url):
+                raise ValueError(f"Unsupported site for {series_name or series_url}")
+            item['image_urls'] = await self.scraper.get_chapter_images(chapter['url'])
+            if not item['image_urls']:
+                raise ValueError(f"No images found for {chapter['name']}")
+
+        async def download(item):
+            if item.get('image_urls'):
+                item['prefetched'] = await self.pdf_processor.prefetch_chapter_images(item['image_urls'], priority)
+                if not any(item['prefetched']):
+                    raise ValueError(f"No images downloaded for {item['chapter']['name']}")
+
+        async def render(item):
+            if item.get('image_urls'):
+                chapter = item['chapter']
+                item['pdf_paths'] = await self.pdf_processor.render_chapter_pdf(
+                    item.pop('image_urls'), item.pop('prefetched'), chapter['name'], series_url, chapter['url'],
+                    profile, priority
+                )
+
+        async def upload(item):
+            chapter = item['chapter']
+            await self.edit_status(payload['status'], f"🔄 Sending {chapter['name']} ({item['index'] + 1}/{len(chapters)})...")
+            sent = False
             try:
-                logger.info(f"Checking {manhwa.name}")
-                new_chapters = await self.scraper.check_new_chapters(manhwa)
-                for chapter in new_chapters:
-                    # Get the user\'s specific output channel for this manhwa
-                    user_output_channel = self.db.get_user_output_channel(manhwa.telegram_user_id)
-                    if not user_output_channel:
-                        logger.warning(f"No output channel set for user {manhwa.telegram_user_id} tracking {manhwa.name}. Skipping delivery of {chapter['name']}.")
-                        continue
-
-                    success = await self.process_and_deliver_chapter(manhwa, chapter, manhwa.telegram_user_id)
-                    if success:
-                        updates.append((manhwa.name, chapter['name']))
-                        # Update database
-                        self.db.update_manhwa_progress(
-                            manhwa.name,
-                            chapter['url'],
-                            chapter['name']
+                if item.get('by_file_id'):
+                    # Falls back to a full build if the stored file_id went stale
+                    sent = bool(await self.deliver_chapter(
+                        series_url, series_name, chapter, [payload['chat_id']], priority, profile
+                    ))
+                elif item.get('pdf_paths'):
+                    # Parts go out in order here while the next chapter renders
+                    file_key = self.pdf_processor.chapter_key(chapter['url'], profile)
+                    sent = await self.send_cached_chapter(file_key, series_name, chapter['name'], payload['chat_id'])
+                    if sent is None:
+                        sent = await self.send_chapter_files(
+                            item['pdf_paths'], series_name, chapter['name'], payload['chat_id'], file_key
                         )
-            except Exception as e:
-                logger.error(f"Error checking {manhwa.name}: {e}")
-        return updates
+            finally:
+                release(item)
+                # Checkpoint in chapter order so a resumed job continues after the last one handled
+                if sent:
+                    job.checkpoint(next_index=item['index'] + 1, sent=payload['sent'] + 1)
+                else:
+                    job.checkpoint(next_index=item['index'] + 1, failed=payload['failed'] + [chapter['name']])
 
-    async def process_and_deliver_chapter(self, manhwa, chapter, user_id: int) -> bool:
-        """Process and deliver a chapter to a user"""
+        def release(item):
+            pdf_paths = item.pop('pdf_paths', None)
+            if pdf_paths:
+                self.pdf_processor.release_pdf(pdf_paths)
+
+        pipeline = Pipeline(
+            [('scrape', scrape), ('download', download), ('render', render), ('upload', upload)],
+            queue_size=self.config.PIPELINE_QUEUE_SIZE,
+            discard=release
+        )
+        await pipeline.run(items)
+
+        if payload['sent'] > 0:
+            if payload['progress']:
+                # Update database with latest chapter info
+                self.db.update_manhwa_progress(
+                    payload['progress']['series_id'],
+                    payload['progress']['user_id'],
+                    chapters[-1]['url'],
+                    chapters[-1]['name']
+                )
+            text = f"✅ Successfully sent {payload['sent']} chapter(s)!"
+            if payload['failed']:
+                text += f"\n❌ Failed: {', '.join(payload['failed'])}"
+        else:
+            text = "❌ Failed to process any chapters"
+        await self.edit_status(payload['status'], text)
+
+    async def edit_status(self, status, text: str):
+        """Edit a queued request's status message, ignoring messages that are gone or unchanged"""
+        chat_id, message_id = status
         try:
-            # Create PDF
-            pdf_path = await self.pdf_processor.create_chapter_pdf(
-                chapter['images'],
-                manhwa.name,
-                chapter['name']
-            )
-            
-            if not pdf_path:
-                logger.error("Failed to create PDF")
-                return False
-            
-            logger.info(f"PDF created successfully at {pdf_path}")
-            
-            # Send to user
-            success = await self.send_chapter_to_user(pdf_path, manhwa.name, chapter['name'], user_id)
-            
-            # Cleanup
-            if os.path.exists(pdf_path):
-                os.remove(pdf_path)
+            await self.bot.edit_message_text(text=text, chat_id=chat_id, message_id=message_id)
+        except Exception as e:
+            logger.debug(f"Could not update status message: {e}")
+
+    async def deliver_chapter(self, series_url: str, series_name: Optional[str], chapter, chat_ids: List[int],
+                              priority: int = PRIORITY_BACKGROUND, profile: Optional[RenderProfile] = None) -> List[int]:
+        """Build a chapter PDF once and send it to each chat, returning the chats that received it"""
+        if not chat_ids:
+            return []
+        try:
+            # Chapters Telegram already stores are resent by file_id without building anything
+            file_key = self.pdf_processor.chapter_key(chapter['url'], profile)
+            delivered = []
+            needs_upload = []
+            for chat_id in chat_ids:
+                sent = await self.send_cached_chapter(file_key, series_name, chapter['name'], chat_id)
+                if sent is None:
+                    needs_upload.append(chat_id)
+                elif sent:
+                    delivered.append(chat_id)
+            if not needs_upload:
+                return delivered
+
+            # A chapter built earlier with the same settings needs no scrape, download or render
+            pdf_paths = self.pdf_processor.get_cached_pdf(chapter['url'], profile)
+            streamed = []
+            failed = set()
+            if not pdf_paths:
+                # Scrape the chapter's image list unless the caller already has it
+                images = chapter.get('images')
+                if not images:
+                    if not self.scraper.get_scraper(series_url):
+                        logger.error(f"Unsupported site for {series_name or series_url}")
+                        return delivered
+                    images = await self.scraper.get_chapter_images(chapter['url'])
+                if not images:
+                    logger.error(f"No images found for {chapter['name']}")
+                    return delivered
+
+                # Parts of a chapter over the upload limit are sent while later ones are written
+                parts = asyncio.Queue()
+
+                async def send_parts():
+                    while (part := await parts.get()) is not None:
+                        path, number, final = part
+                        for chat_id in needs_upload:
+                            if chat_id not in failed and not await self.send_chapter_part(
+                                    path, series_name, chapter['name'], chat_id, file_key, number, final):
+                                failed.add(chat_id)
+                        streamed.append(path)
+
+                # Our own pin keeps published parts on disk until they are sent, even if the
+                # build fails after them and drops its pin first
+                self.pdf_processor.pin_chapter(file_key)
+                sender = asyncio.create_task(send_parts())
+                try:
+                    # Create PDF
+                    pdf_paths = await self.pdf_processor.create_chapter_pdf(
+                        images,
+                        chapter['name'],
+                        series_url,
+                        priority=priority,
+                        chapter_url=chapter['url'],
+                        profile=profile,
+                        on_part=lambda path, number, final: parts.put_nowait((path, number, final))
+                    )
+                finally:
+                    parts.put_nowait(None)
+                    try:
+                        await sender
+                    finally:
+                        self.pdf_processor.unpin_chapter(file_key)
+                
+                if not pdf_paths:
+                    logger.error("Failed to create PDF")
+                    return delivered
+                
+                logger.info(f"PDF created successfully at {pdf_paths[0]} ({len(pdf_paths)} part(s))")
             
-            return success
+            try:
+                if streamed == pdf_paths:
+                    delivered.extend(chat_id for chat_id in needs_upload if chat_id not in failed)
+                    return delivered
+                # Cached, or built by a concurrent caller: nothing has been sent yet
+                for chat_id in needs_upload:
+                    # After the first upload the remaining chats get the file_ids
+                    if await self.send_chapter_files(pdf_paths, series_name, chapter['name'], chat_id, file_key):
+                        delivered.append(chat_id)
+            finally:
+                # Unpin; the files stay cached until evicted
+                self.pdf_processor.release_pdf(pdf_paths)
+            return delivered
             
         except Exception as e:
-            logger.error(f"Error in process_and_deliver_chapter: {e}")
+            logger.error(f"Error in deliver_chapter: {e}")
+            return []
+
+    @staticmethod
+    def chapter_caption(manhwa_name: Optional[str], chapter_name: str, part: int = 0) -> str:
+        caption = f"📚 {manhwa_name}\n📖 {chapter_name}" if manhwa_name else f"Chapter: {chapter_name}"
+        return f"{caption}\n🧩 Part {part}" if part else caption
+
+    async def send_cached_chapter(self, file_key: str, manhwa_name, chapter_name, user_id: int) -> Optional[bool]:
+        """Send a chapter by its stored Telegram file_id
+
+        Returns None when there is no usable file_id and the file has to be uploaded.
+        """
+        file_ids = self.db.get_telegram_file_ids(file_key)
+        if not file_ids:
+            return None
+        try:
+            for number, file_id in enumerate(file_ids, 1):
+                await self.bot.send_document(
+                    chat_id=user_id,
+                    document=file_id,
+                    caption=self.chapter_caption(manhwa_name, chapter_name, number if len(file_ids) > 1 else 0)
+                )
+                self.delivery_stats['file_id_sends'] += 1
+            return True
+        except TelegramBadRequest as e:
+            # Telegram rejected the id; forget it and fall back to uploading
+            logger.warning(f"Stale file_id for {chapter_name}, re-uploading: {e}")
+            self.db.delete_telegram_file(file_key)
+            self.delivery_stats['stale_file_ids'] += 1
+            return None
+        except Exception as e:
+            logger.error(f"Error sending {chapter_name} by file_id to {user_id}: {e}")
             return False
 
-    async def send_chapter_to_user(self, pdf_path, manhwa_name, chapter_name, user_id: int):
-        """Send chapter PDF to user's DM"""
+    async def send_chapter_files(self, pdf_paths: List[str], manhwa_name, chapter_name, user_id: int,
+                                 file_key: str) -> bool:
+        """Send every part of a chapter to a chat in order, stopping at the first that fails"""
+        for number, pdf_path in enumerate(pdf_paths, 1):
+            if not await self.send_chapter_part(pdf_path, manhwa_name, chapter_name, user_id, file_key,
+                                                number, number == len(pdf_paths)):
+                return False
+        return True
+
+    async def send_chapter_part(self, pdf_path, manhwa_name, chapter_name, user_id: int, file_key: str,
+                                number: int = 1, final: bool = True) -> bool:
+        """Send one part of a chapter, by the file_id an earlier upload of it left if there is one"""
+        file_id = self.db.get_telegram_file_id(telegram_part_key(file_key, number))
+        if file_id:
+            try:
+                await self.bot.send_document(
+                    chat_id=user_id,
+                    document=file_id,
+                    caption=self.chapter_caption(manhwa_name, chapter_name, 0 if number == 1 and final else number)
+                )
+                self.delivery_stats['file_id_sends'] += 1
+                if final:
+                    self.db.set_telegram_file_parts(file_key, number)
+                return True
+            except TelegramBadRequest as e:
+                logger.warning(f"Stale file_id for part {number} of {chapter_name}, re-uploading: {e}")
+                self.delivery_stats['stale_file_ids'] += 1
+            except Exception as e:
+                logger.error(f"Error sending part {number} of {chapter_name} by file_id to {user_id}: {e}")
+                return False
+        return await self.send_chapter_to_user(pdf_path, manhwa_name, chapter_name, user_id, file_key, number, final)
+
+    async def send_chapter_to_user(self, pdf_path, manhwa_name, chapter_name, user_id: int, file_key: Optional[str] = None,
+                                   number: int = 1, final: bool = True):
+        """Upload a chapter PDF, or part number of one, to a chat, remembering Telegram's file_id under file_key
+
+        A chapter's first part is recorded as incomplete until its final part is uploaded.
+        """
         try:
             logger.info(f"Attempting to send PDF to user {user_id}")
             logger.info(f"PDF path: {pdf_path}")
             logger.info(f"File exists: {os.path.exists(pdf_path)}")
             
             # Create caption
-            caption = f"📚 {manhwa_name}\n📖 {chapter_name}"
+            caption = self.chapter_caption(manhwa_name, chapter_name, 0 if number == 1 and final else number)
             logger.info(f"Created caption: {caption}")
             
             # Send PDF using FSInputFile
@@ -579,6 +1052,17 @@ class ManhwaBot:
                     caption=caption
                 )
                 logger.info(f"Successfully sent message to user. Message ID: {message.message_id}")
+                self.delivery_stats['uploads'] += 1
+                if file_key and message.document:
+                    self.db.save_telegram_file(
+                        telegram_part_key(file_key, number),
+                        message.document.file_id,
+                        message.document.file_unique_id,
+                        message.document.file_size,
+                        None if number > 1 or final else 0
+                    )
+                    if final and number > 1:
+                        self.db.set_telegram_file_parts(file_key, number)
                 return True
             except Exception as send_error:
                 logger.error(f"Error during send_document: {str(send_error)}")
@@ -741,8 +1225,7 @@ class ManhwaBot:
                     await status_msg.edit_text("❌ Unsupported site.")
                     return
                 
-                session = await self.scraper.get_session()
-                chapters = await scraper.get_latest_chapters(session, url)
+                chapters = await self.scraper.get_latest_chapters(url)
                 
                 if not chapters:
                     await status_msg.edit_text("❌ No chapters found.")
@@ -780,10 +1263,17 @@ class ManhwaBot:
 
     async def start_bot(self):
         """Start the bot"""
+        poll_task = None
+        jobs_task = None
         try:
             # Initialize database
             self.db.init_tables()
 
+            # Start the job workers, resuming work interrupted by a restart, then the update checks
+            self.db.prune_jobs()
+            jobs_task = asyncio.create_task(self.jobs.run())
+            poll_task = asyncio.create_task(self.poller.run())
+
             # Start polling with retry mechanism
             logger.info("Starting Manhwa Bot...")
             retry_count = 0
@@ -807,86 +1297,34 @@ class ManhwaBot:
         except Exception as e:
             logger.error(f"Error starting bot: {e}")
             sys.exit(1)
+        finally:
+            for task in (poll_task, jobs_task):
+                if task:
+                    task.cancel()
+            self.pdf_processor.render_pool.shutdown()
+            await self.scraper.close_session()
 
     async def create_pdf(self, image_urls: List[str], output_path: str, manhwa_name: str, chapter_num: str) -> None:
         """Create a PDF from a list of image URLs with watermark"""
         try:
             # Download all images
-            images = []
-            async with aiohttp.ClientSession() as session:
-                for url in image_urls:
-                    try:
-                        async with session.get(url) as response:
-                            if response.status == 200:
-                                image_data = await response.read()
-                                # Open image with PIL
-                                img = Image.open(io.BytesIO(image_data))
-                                # Convert to RGB if necessary
-                                if img.mode in ('RGBA', 'LA'):
-                                    background = Image.new('RGB', img.size, (255, 255, 255))
-                                    background.paste(img, mask=img.split()[-1])
-                                    img = background
-                                elif img.mode != 'RGB':
-                                    img = img.convert('RGB')
-                                
-                                # Add watermark
-                                draw = ImageDraw.Draw(img)
-                                # Use a much smaller font size (0.8% of image height)
-                                font_size = int(img.size[1] * 0.008)
-                                try:
-                                    font = ImageFont.truetype("arial.ttf", font_size)
-                                except:
-                                    font = ImageFont.load_default()
-                                
-                                watermark_text = "join @manga_stash"
-                                # Calculate text size
-                                text_bbox = draw.textbbox((0, 0), watermark_text, font=font)
-                                text_width = text_bbox[2] - text_bbox[0]
-                                text_height = text_bbox[3] - text_bbox[1]
-                                
-                                # Position in bottom right with padding
-                                padding = int(img.size[0] * 0.005)  # 0.5% padding
-                                position = (
-                                    img.size[0] - text_width - padding,
-                                    img.size[1] - text_height - padding
-                                )
-                                
-                                # Add very subtle watermark (more transparent)
-                                draw.text(position, watermark_text, font=font, fill=(128, 128, 128, 64))
-                                
-                                # Save to bytes
-                                img_byte_arr = io.BytesIO()
-                                img.save(img_byte_arr, format='JPEG', quality=90, optimize=True)
-                                images.append(img_byte_arr.getvalue())
-                    except Exception as e:
-                        logger.error(f"Error downloading image {url}: {e}")
-                        continue
+            downloaded = await self.scraper.downloads.fetch_all(image_urls, PRIORITY_INTERACTIVE)
+            downloaded = [image_data for image_data in downloaded if image_data is not None]
+
+            render_pool = self.pdf_processor.render_pool
+            images = await render_pool.map(
+                rendering.watermark_page, downloaded, "join @manga_stash", SUBTLE_STYLE, 'JPEG', 90, True, True
+            )
+            images = [image for image in images if image]
 
             if not images:
                 raise Exception("No images were successfully downloaded")
 
-            # Create temporary PDF
-            temp_pdf_path = f"temp_{output_path}"
-            with open(temp_pdf_path, "wb") as f:
-                f.write(img2pdf.convert(images))
-
-            # Compress PDF
-            reader = PdfReader(temp_pdf_path)
-            writer = PdfWriter()
-
-            # Copy pages with compression
-            for page in reader.pages:
-                writer.add_page(page)
-
-            # Set compression parameters
-            writer.add_metadata(reader.metadata)
-            
-            # Write compressed PDF
+            # Create and compress the PDF
+            pdf_data = await render_pool.run(rendering.assemble_pdf, images)
+            pdf_data = await render_pool.run(rendering.compress_pdf, pdf_data)
             with open(output_path, "wb") as output_file:
-                writer.write(output_file)
-
-            # Clean up temporary file
-            os.remove(temp_pdf_path)
+                output_file.write(pdf_data)
 
             logger.info(f"Successfully created compressed PDF with {len(images)} images")
         except Exception as e:
@@ -896,6 +1334,11 @@ class ManhwaBot:
 if __name__ == "__main__":
     # Create process lock
     create_lock()
+
+    # Register cleanup handlers here, not at import: render pool workers re-import this module
+    atexit.register(remove_lock)
+    signal.signal(signal.SIGINT, lambda s, f: (remove_lock(), sys.exit(0)))
+    signal.signal(signal.SIGTERM, lambda s, f: (remove_lock(), sys.exit(0)))
     
     try:
         # Initialize logging
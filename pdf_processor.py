@@ -1,209 +1,537 @@
 import os
 import tempfile
-from PIL import Image, ImageDraw, ImageFont
-import img2pdf
-from typing import List, Optional
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
 import logging
 from config import Config
+from http_client import HttpClient
+from download_scheduler import DownloadScheduler, PRIORITY_BACKGROUND
+from singleflight import SingleFlight
+from artifact_cache import ArtifactCache, PARTIAL_SUFFIX
+from render_pool import RenderPool
+import rendering
+from watermark import DEFAULT_STYLE
+from render_profiles import RenderProfile, OUTPUT_FORMATS, PROFILES, find_profile
+from strip_tiler import Segment, StripPage, StripTiler
+from pdf_writer import ImagePdfWriter, probe_jpeg
+from cbz_writer import CbzWriter, image_extension
 import asyncio
 import re
-import aiohttp
 import aiofiles
-import io
 
 logger = logging.getLogger(__name__)
 
-class PDFProcessor:
+class BuildTracker:
+    """Bytes of page data a build holds, the most it held at once, and pages it re-encoded"""
     def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self.reencoded = 0
+
+    def hold(self, size: int):
+        self.current += size
+        self.peak = max(self.peak, self.current)
+
+    def release(self, size: int):
+        self.current -= size
+
+# Called with (path, part number, whether it is the last part) as each part file is finished
+PartCallback = Callable[[str, int, bool], None]
+
+class PartedOutput:
+    """Writes pages to path, rolling over into "(Part 2)", "(Part 3)" files at a byte budget.
+
+    A new part starts before a page would take the current one over max_bytes, so every
+    part except one made of a single oversized page stays within it. Parts are written
+    under a partial name and renamed once complete.
+    """
+    # Room for the page and trailer objects written around the image bytes
+    PAGE_OVERHEAD = 1024
+    CLOSE_OVERHEAD = 64 * 1024
+
+    def __init__(self, path: str, make_writer: Callable, max_bytes: int, on_part: Optional[PartCallback] = None):
+        self.path = path
+        self.make_writer = make_writer
+        self.max_bytes = max_bytes
+        self.on_part = on_part
+        self.paths: List[str] = []
+        self.total_pages = 0
+        self._open(1)
+
+    def _open(self, number: int):
+        self.partial_path = f"{self.path}.{number}{PARTIAL_SUFFIX}"
+        self.file = open(self.partial_path, "wb")
+        self.writer = self.make_writer(self.file)
+        self.pages = 0
+
+    def part_path(self, number: int) -> str:
+        root, extension = os.path.splitext(self.path)
+        return f"{root} (Part {number}){extension}"
+
+    def add_page(self, page):
+        if self.pages and self.file.tell() + len(page[0]) + self.PAGE_OVERHEAD + self.CLOSE_OVERHEAD > self.max_bytes:
+            # The next part exists before this one is published, so a crash never leaves a
+            # directory that looks like a finished chapter
+            finished = (self.file, self.writer, self.partial_path)
+            number = len(self.paths) + 1
+            self._open(number + 1)
+            self._publish(*finished, number, self.part_path(number), final=False)
+        elif not self.pages and len(page[0]) > self.max_bytes:
+            logger.warning(f"A single page of {len(page[0]) / 1048576:.1f} MB is over the part budget")
+        self.writer.add_page(*page)
+        self.pages += 1
+        self.total_pages += 1
+
+    def _publish(self, file, writer, partial_path: str, number: int, path: str, final: bool):
+        writer.close()
+        file.close()
+        os.replace(partial_path, path)
+        self.paths.append(path)
+        if self.on_part:
+            self.on_part(path, number, final)
+
+    def close(self) -> List[str]:
+        """Finish the last part, returning every part's path in order"""
+        number = len(self.paths) + 1
+        file, self.file = self.file, None
+        self._publish(file, self.writer, self.partial_path, number,
+                      self.path if number == 1 else self.part_path(number), final=True)
+        return self.paths
+
+    def abort(self):
+        """Drop the part being written, if any; finished parts are left to the artifact cache"""
+        if self.file is not None:
+            # The writer goes first, while its file is still open
+            self.writer.abort()
+            self.file.close()
+            self.file = None
+            try:
+                os.remove(self.partial_path)
+            except OSError:
+                pass
+
+class PDFProcessor:
+    # Bump when the rendering changes so files built the old way are not reused
+    RENDER_VERSION = 3
+
+    def __init__(self, http_client: Optional[HttpClient] = None, downloads: Optional[DownloadScheduler] = None,
+                 render_pool: Optional[RenderPool] = None):
         self.config = Config()
         self.watermark_text = self.config.WATERMARK_TEXT
+        # Share the scraper manager's pooled client and scheduler when injected
+        self.http = http_client or HttpClient.from_config(self.config)
+        self.downloads = downloads or DownloadScheduler.from_config(self.http, self.config)
+        # Concurrent builds of the same chapter share one build and one output file
+        self.build_flights = SingleFlight('pdf build')
+        # Built chapters stay on disk for later requests until evicted
+        self.artifacts = ArtifactCache.from_config(self.config)
+        # CPU-bound page rendering runs in worker processes, off the event loop
+        self.render_pool = render_pool or RenderPool.from_config(self.config)
+        self.default_format = self.config.OUTPUT_FORMAT if self.config.OUTPUT_FORMAT in OUTPUT_FORMATS else 'pdf'
+        self.default_profile = (find_profile(self.config.RENDER_PROFILE) or PROFILES['standard'])._replace(
+            output_format=self.default_format
+        )
+        self.cbz_watermark = self.config.CBZ_WATERMARK
+        # Telegram bots can't upload files over 50 MB; bigger chapters are split into parts
+        self.part_max_bytes = int(self.config.UPLOAD_PART_MAX_MB * 1024 * 1024)
+        # Pages of one chapter loaded or rendered ahead of the one being written
+        self.page_window = max(1, self.config.PDF_PAGE_WINDOW)
+        self.build_stats = {'builds': 0, 'pages': 0, 'last_peak_bytes': 0, 'peak_bytes': 0}
+        # Builds, pages, seconds and output bytes per render profile, to compare their cost
+        self.profile_stats = {name: {'builds': 0, 'pages': 0, 'seconds': 0.0, 'bytes': 0} for name in [*PROFILES, 'cbz']}
     
     async def add_watermark(self, image_url: str) -> Optional[str]:
         """Add watermark to an image"""
+        temp_output = f"temp_output_{os.urandom(4).hex()}.webp"
         try:
-            # Create a temporary file for the downloaded image
-            temp_input = f"temp_input_{os.urandom(4).hex()}.webp"
-            temp_output = f"temp_output_{os.urandom(4).hex()}.webp"
-            
             # Download the image
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url) as response:
-                    if response.status != 200:
-                        logger.error(f"Failed to download image: {response.status}")
-                        return None
-                    
-                    # Save the image to a temporary file
-                    async with aiofiles.open(temp_input, 'wb') as f:
-                        await f.write(await response.read())
-            
-            # Open and process the image
-            with Image.open(temp_input) as img:
-                # Convert to RGB if necessary
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Create a copy for drawing
-                img_with_watermark = img.copy()
-                draw = ImageDraw.Draw(img_with_watermark)
-                
-                # Get image dimensions
-                width, height = img.size
-                
-                # Calculate font size (5% of image height)
-                font_size = int(height * 0.05)
-                try:
-                    font = ImageFont.truetype("arial.ttf", font_size)
-                except:
-                    # Fallback to default font if arial.ttf is not available
-                    font = ImageFont.load_default()
-                
-                # Calculate text size
-                text_bbox = draw.textbbox((0, 0), self.watermark_text, font=font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
-                
-                # Calculate position (bottom right corner with padding)
-                x = width - text_width - int(width * 0.02)  # 2% padding from right
-                y = height - text_height - int(height * 0.02)  # 2% padding from bottom
-                
-                # Add semi-transparent watermark
-                draw.text((x, y), self.watermark_text, font=font, fill=(128, 128, 128, 128))
-                
-                # Save the watermarked image
-                img_with_watermark.save(temp_output, 'WEBP', quality=95)
-            
-            # Clean up the input file
-            os.remove(temp_input)
-            
+            session = await self.http.get_session()
+            async with session.get(image_url) as response:
+                if response.status != 200:
+                    logger.error(f"Failed to download image: {response.status}")
+                    return None
+                image_data = await response.read()
+
+            watermarked = await self.render_pool.run(
+                rendering.watermark_page, image_data, self.watermark_text, DEFAULT_STYLE, 'WEBP'
+            )
+            if watermarked is None:
+                return None
+
+            # Save the watermarked image
+            async with aiofiles.open(temp_output, 'wb') as f:
+                await f.write(watermarked)
             return temp_output
             
         except Exception as e:
             logger.error(f"Error adding watermark to {image_url}: {e}")
             # Clean up any temporary files
-            for temp_file in [temp_input, temp_output]:
-                try:
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
-                except:
-                    pass
+            try:
+                if os.path.exists(temp_output):
+                    os.remove(temp_output)
+            except:
+                pass
             return None
     
-    async def create_chapter_pdf(self, image_urls: List[str], chapter_name: str, manhwa_url: str) -> Optional[str]:
-        """Create a PDF from a list of image URLs"""
+    def chapter_pdf_filename(self, chapter_name: str, manhwa_url: str, extension: str = 'pdf') -> str:
+        """Get the file name for a chapter PDF, or other output format"""
+        # Extract chapter number from chapter name
+        chapter_num = re.search(r'\d+(?:\.\d+)?', chapter_name)
+        if not chapter_num:
+            chapter_num = "0"
+        else:
+            chapter_num = chapter_num.group()
+
+        # Extract manhwa name from URL
+        manhwa_name = manhwa_url.rstrip('/').split('/')[-1].replace('-', ' ').title()
+        safe_manhwa_name = re.sub(r'[^a-zA-Z0-9\s-]', '', manhwa_name)
+
+        # Create PDF filename
+        return f"Chapter {chapter_num} - {safe_manhwa_name}.{extension}"
+
+    def get_profile(self, name: Optional[str] = None, output_format: Optional[str] = None) -> RenderProfile:
+        """Get a render profile by name, or the configured default for unknown or missing names,
+        set to build output_format files (the configured default format unless given)"""
+        profile = find_profile(name) or self.default_profile
+        if output_format not in OUTPUT_FORMATS:
+            output_format = self.default_format
+        return profile._replace(output_format=output_format)
+
+    def render_settings(self, profile: Optional[RenderProfile] = None) -> Dict:
+        """Settings that change the bytes of a built chapter, and so its cache key"""
+        profile = profile or self.default_profile
+        if profile.output_format == 'cbz':
+            # CBZs keep the original images, so every profile shares one file
+            return {'format': 'cbz', 'watermark': self.watermark_text if self.cbz_watermark == 'first' else None,
+                    'part_bytes': self.part_max_bytes, 'version': self.RENDER_VERSION}
+        return {'format': 'pdf', 'profile': profile.name, 'max_width': profile.max_width, 'quality': profile.quality,
+                'passthrough': profile.passthrough, 'page_aspect': profile.page_aspect,
+                'watermark': self.watermark_text, 'part_bytes': self.part_max_bytes, 'version': self.RENDER_VERSION}
+
+    def chapter_key(self, chapter_url: str, profile: Optional[RenderProfile] = None) -> str:
+        """Artifact cache key of a chapter rendered with a profile's settings"""
+        return ArtifactCache.make_key(chapter_url, self.render_settings(profile))
+
+    def get_cached_pdf(self, chapter_url: str, profile: Optional[RenderProfile] = None) -> Optional[List[str]]:
+        """Get the already built file(s) of a chapter without scraping or downloading anything
+
+        Returned paths must be handed back with release_pdf.
+        """
+        key = self.chapter_key(chapter_url, profile)
+        self.artifacts.pin(key)
+        paths = self.artifacts.get(key)
+        if paths is None:
+            self.artifacts.unpin(key)
+        else:
+            logger.info(f"Serving cached chapter {paths[0]} ({len(paths)} part(s))")
+        return paths
+
+    async def create_chapter_pdf(self, image_urls: List[str], chapter_name: str, manhwa_url: str,
+                                 priority: int = PRIORITY_BACKGROUND, chapter_url: Optional[str] = None,
+                                 profile: Optional[RenderProfile] = None,
+                                 on_part: Optional[PartCallback] = None) -> Optional[List[str]]:
+        """Create a PDF from a list of image URLs, reusing cached and identical concurrent builds
+
+        Returns the chapter's part files in order (one unless it is over the part budget).
+        on_part sees each part as soon as it is written, but only when this call builds the
+        chapter. Every caller that receives paths must hand them back with release_pdf.
+        """
+        profile = profile or self.default_profile
+        # Without a chapter URL the image list identifies the chapter
+        key = self.chapter_key(chapter_url or "\n".join(image_urls), profile)
+        return await self._get_or_build(
+            key,
+            self.chapter_pdf_filename(chapter_name, manhwa_url, profile.output_format),
+            lambda pdf_path: self._build_chapter_pdf(image_urls, pdf_path, priority, profile, on_part)
+        )
+
+    async def render_chapter_pdf(self, image_urls: List[str], prefetched: List[Optional[bytes]], chapter_name: str,
+                                 manhwa_url: str, chapter_url: str, profile: Optional[RenderProfile] = None,
+                                 priority: int = PRIORITY_BACKGROUND,
+                                 on_part: Optional[PartCallback] = None) -> Optional[List[str]]:
+        """Create a PDF from the first pages downloaded by prefetch_chapter_images and the rest
+        streamed through the page window, reusing cached and concurrent builds
+
+        Returns and reports parts like create_chapter_pdf. Every caller that receives paths
+        must hand them back with release_pdf.
+        """
+        profile = profile or self.default_profile
+        return await self._get_or_build(
+            self.chapter_key(chapter_url, profile),
+            self.chapter_pdf_filename(chapter_name, manhwa_url, profile.output_format),
+            lambda pdf_path: self._build_chapter_pdf(image_urls, pdf_path, priority, profile, on_part, prefetched)
+        )
+
+    async def _get_or_build(self, key: str, filename: str, build) -> Optional[List[str]]:
+        """Return the pinned cached files for key, building them once with build(pdf_path) if missing"""
+        # Pin before awaiting so eviction never deletes the file under us
+        self.artifacts.pin(key)
         try:
-            # Extract chapter number from chapter name
-            chapter_num = re.search(r'\d+(?:\.\d+)?', chapter_name)
-            if not chapter_num:
-                chapter_num = "0"
-            else:
-                chapter_num = chapter_num.group()
+            cached = self.artifacts.get(key)
+            if cached:
+                return cached
+            pdf_path = self.artifacts.path_for(key, filename)
 
-            # Extract manhwa name from URL
-            manhwa_name = manhwa_url.split('/')[-1].replace('-', ' ').title()
-            safe_manhwa_name = re.sub(r'[^a-zA-Z0-9\s-]', '', manhwa_name)
+            async def run():
+                result = await build(pdf_path)
+                if result:
+                    self.artifacts.add(key, result)
+                return result
 
-            # Create PDF filename
-            pdf_filename = f"Chapter {chapter_num} - {safe_manhwa_name}.pdf"
-            pdf_path = os.path.join(self.config.TEMP_DIR, pdf_filename)
+            result = await self.build_flights.do(key, run)
+        except BaseException:
+            self.artifacts.unpin(key)
+            raise
+        if not result:
+            self.artifacts.unpin(key)
+        return result
 
+    def release_pdf(self, pdf_paths: List[str]):
+        """Let a delivered chapter's files be evicted from the artifact cache again"""
+        self.artifacts.unpin(ArtifactCache.key_for_path(pdf_paths[0]))
+
+    def pin_chapter(self, key: str):
+        """Keep a chapter's files, parts published by a build that later fails included, until unpin_chapter"""
+        self.artifacts.pin(key)
+
+    def unpin_chapter(self, key: str):
+        self.artifacts.unpin(key)
+
+    async def _build_chapter_pdf(self, image_urls: List[str], pdf_path: str, priority: int,
+                                 profile: RenderProfile, on_part: Optional[PartCallback] = None,
+                                 prefetched: Optional[List[Optional[bytes]]] = None) -> Optional[List[str]]:
+        """Download, watermark and write chapter images into a PDF, a window of pages at a time
+
+        Pages already in prefetched are taken from it, and dropped from it once loaded.
+        """
+        prefetched = prefetched or []
+
+        async def load(index: int) -> Optional[bytes]:
+            if index < len(prefetched):
+                image_data, prefetched[index] = prefetched[index], None
+                if image_data:
+                    return image_data
+            return await self.downloads.fetch(image_urls[index], priority)
+
+        return await self._write_pages(len(image_urls), load, pdf_path, profile, on_part)
+
+    async def prefetch_chapter_images(self, image_urls: List[str],
+                                      priority: int = PRIORITY_BACKGROUND) -> List[Optional[bytes]]:
+        """Download a chapter's first page window ahead of its build, None for failed pages
+
+        Only a window is fetched so a chapter waiting to render holds no more pages than
+        one being written; render_chapter_pdf streams the rest.
+        """
+        return await self.downloads.fetch_all(image_urls[:self.page_window], priority)
+
+    async def _write_pages(self, count: int, load: Callable[[int], Awaitable[Optional[bytes]]],
+                           pdf_path: str, profile: RenderProfile, on_part: Optional[PartCallback] = None) -> Optional[List[str]]:
+        """Stream pages into pdf_path (a PDF or a CBZ) in order, holding at most page_window pages in memory
+
+        Page i + page_window is only loaded once page i has been written, so a long chapter
+        costs a window of images rather than all of them, downloaded and rendered. Profiles
+        with a page aspect re-cut the pages into tiles on the way (see StripTiler). Output
+        over the part budget is split into part files, each passed to on_part when finished.
+        """
+        started = time.monotonic()
+        gauge = BuildTracker()
+        tasks: Dict[int, asyncio.Future] = {}
+        cbz = profile.output_format == 'cbz'
+        tiler = StripTiler(profile.page_aspect) if profile.page_aspect and not cbz else None
+        tiles: Deque[asyncio.Future] = deque()
+        output: Optional[PartedOutput] = None
+        writing: Optional[asyncio.Future] = None
+        loop = asyncio.get_running_loop()
+
+        def start(index: int):
+            if index < count:
+                prepare = self._prepare_cbz_page(load, index, gauge) if cbz else self._prepare_page(load, index, gauge, profile)
+                tasks[index] = asyncio.ensure_future(prepare)
+
+        async def in_thread(func: Callable, *args):
+            # File writes block for as long as the disk takes, so they run off the event loop,
+            # one at a time. Shielded: a cancelled build still lets the write in progress
+            # finish before the finally below touches the output.
+            nonlocal writing
+            writing = asyncio.ensure_future(asyncio.to_thread(func, *args))
+            return await asyncio.shield(writing)
+
+        # Parts are published from the writing thread but reported on the event loop, in order
+        notify = (lambda *part: loop.call_soon_threadsafe(on_part, *part)) if on_part else None
+
+        try:
             # Create temp directory if it doesn't exist
-            os.makedirs(self.config.TEMP_DIR, exist_ok=True)
-
-            # Download and process images concurrently
-            async def process_image(url: str) -> Optional[bytes]:
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(url) as response:
-                            if response.status != 200:
-                                return None
-                            
-                            # Read image data
-                            image_data = await response.read()
-                            
-                            # Process image in memory
-                            with Image.open(io.BytesIO(image_data)) as img:
-                                # Convert to RGB if necessary
-                                if img.mode != 'RGB':
-                                    img = img.convert('RGB')
-                                
-                                # Create a copy for watermarking
-                                img_with_watermark = img.copy()
-                                draw = ImageDraw.Draw(img_with_watermark)
-                                
-                                # Get image dimensions
-                                width, height = img.size
-                                
-                                # Calculate font size (5% of image height)
-                                font_size = int(height * 0.05)
-                                try:
-                                    font = ImageFont.truetype("arial.ttf", font_size)
-                                except:
-                                    font = ImageFont.load_default()
-                                
-                                # Calculate text size
-                                text_bbox = draw.textbbox((0, 0), self.watermark_text, font=font)
-                                text_width = text_bbox[2] - text_bbox[0]
-                                text_height = text_bbox[3] - text_bbox[1]
-                                
-                                # Calculate position (bottom right corner with padding)
-                                x = width - text_width - int(width * 0.02)
-                                y = height - text_height - int(height * 0.02)
-                                
-                                # Add semi-transparent watermark
-                                draw.text((x, y), self.watermark_text, font=font, fill=(128, 128, 128, 128))
-                                
-                                # Save to bytes buffer
-                                output_buffer = io.BytesIO()
-                                img_with_watermark.save(output_buffer, format='JPEG', quality=95)
-                                return output_buffer.getvalue()
-                                
-                except Exception as e:
-                    logger.error(f"Error processing image {url}: {e}")
-                    return None
+            os.makedirs(os.path.dirname(pdf_path) or self.config.TEMP_DIR, exist_ok=True)
+            for index in range(self.page_window):
+                start(index)
+
+            output = await in_thread(
+                PartedOutput,
+                pdf_path,
+                (lambda f: CbzWriter(f)) if cbz else (lambda f: ImagePdfWriter(f, self.watermark_text, DEFAULT_STYLE)),
+                self.part_max_bytes,
+                notify
+            )
+
+            async def write(page, held: int):
+                if page is not None:
+                    await in_thread(output.add_page, page)
+                gauge.release(held)
 
-            # Process all images concurrently
-            tasks = [process_image(url) for url in image_urls]
-            processed_images = await asyncio.gather(*tasks)
-            processed_images = [img for img in processed_images if img]  # Remove None values
+            async def write_tiles(limit: int):
+                # Batches of tiles render in parallel but are written in strip order
+                while tiles and (len(tiles) > limit or tiles[0].done()):
+                    for tile in await tiles.popleft():
+                        await write(*tile)
 
-            if not processed_images:
+            def render_tiles(batch: List[List[Segment]]):
+                # A page's tiles come out of one add() and share one decode
+                if batch:
+                    tiles.append(asyncio.ensure_future(self._render_tiles(batch, tiler.width, gauge, profile)))
+
+            for index in range(count):
+                page = await tasks.pop(index)
+                start(index + self.page_window)
+                if page is None:
+                    continue
+                if tiler is None:
+                    await write(page, len(page[0]))
+                    continue
+                render_tiles(tiler.add(page))
+                await write_tiles(self.page_window)
+            if tiler is not None:
+                render_tiles(tiler.flush())
+                await write_tiles(0)
+            if not output.total_pages:
                 logger.error("No images were successfully processed")
                 return None
+            # Publishes the last part
+            paths = await in_thread(output.close)
 
-            # Create PDF from processed images
-            with open(pdf_path, "wb") as f:
-                f.write(img2pdf.convert(processed_images))
-
-            return pdf_path
+            seconds = time.monotonic() - started
+            size = sum(os.path.getsize(path) for path in paths)
+            self._record_build(profile, output.total_pages, gauge.peak, seconds, size)
+            logger.info(f"Wrote {output.total_pages} pages ({gauge.reencoded} re-encoded) as {profile.output_format.upper()} "
+                        f"with the {profile.name} profile: "
+                        f"{size / 1048576:.1f} MB in {len(paths)} part(s) in {seconds:.1f}s, "
+                        f"peak {gauge.peak / 1048576:.1f} MB of page data in memory")
+            return paths
 
         except Exception as e:
             logger.error(f"Error creating PDF: {e}")
             return None
-    
-    def optimize_image(self, image_path: str, max_width: int = 1200) -> str:
+        finally:
+            if writing is not None and not writing.done():
+                await asyncio.wait([writing])
+            if output is not None:
+                output.abort()
+            for task in list(tasks.values()) + list(tiles):
+                task.cancel()
+
+    async def _prepare_page(self, load: Callable[[int], Awaitable[Optional[bytes]]], index: int,
+                            gauge: 'BuildTracker', profile: RenderProfile):
+        """Load a page and turn it into (jpeg, width, height, mode, watermark layer) for the writer,
+        or into a scanned StripPage when the profile re-tiles"""
+        image_data = await load(index)
+        if not image_data:
+            return None
+        gauge.hold(len(image_data))
+        if profile.page_aspect:
+            return await self._scan_page(image_data, gauge, profile)
+        if profile.passthrough:
+            info = probe_jpeg(image_data)
+            if info and (not profile.max_width or info[0] <= profile.max_width):
+                return (image_data, *info, True)
+        # Pages that are scaled, or can't be embedded as they are, get the watermark in their pixels
+        try:
+            rendered = await self.render_pool.run(
+                rendering.watermark_page, image_data, self.watermark_text, DEFAULT_STYLE, 'JPEG',
+                profile.quality, True, False, profile.max_width
+            )
+            info = probe_jpeg(rendered) if rendered else None
+            if not info:
+                return None
+            gauge.hold(len(rendered))
+            gauge.reencoded += 1
+            return (rendered, *info, False)
+        finally:
+            gauge.release(len(image_data))
+
+    async def _prepare_cbz_page(self, load: Callable[[int], Awaitable[Optional[bytes]]], index: int,
+                                gauge: 'BuildTracker') -> Optional[Tuple[bytes, str]]:
+        """Load a page as (image, extension) for a CBZ, watermarking only the first page if configured"""
+        image_data = await load(index)
+        if not image_data:
+            return None
+        if index > 0 or self.cbz_watermark != 'first':
+            extension = image_extension(image_data)
+            if extension:
+                gauge.hold(len(image_data))
+                return image_data, extension
+            # Formats comic readers may not open are converted rather than left out
+            rendered = await self.render_pool.run(rendering.reencode_page, image_data)
+        else:
+            rendered = await self.render_pool.run(
+                rendering.watermark_page, image_data, self.watermark_text, DEFAULT_STYLE, 'JPEG', 95, True
+            )
+        if not rendered:
+            return None
+        gauge.hold(len(rendered))
+        gauge.reencoded += 1
+        return rendered, 'jpg'
+
+    async def _scan_page(self, image_data: bytes, gauge: 'BuildTracker', profile: RenderProfile) -> Optional[StripPage]:
+        """Measure a page's rows for re-tiling; its bytes stay held until its last tile is written"""
+        scan = await self.render_pool.run(rendering.scan_rows, image_data, profile.max_width)
+        if not scan:
+            gauge.release(len(image_data))
+            return None
+        return StripPage(image_data, *scan)
+
+    async def _render_tiles(self, batch: List[List[Segment]], width: int, gauge: 'BuildTracker',
+                            profile: RenderProfile) -> List[Tuple[Optional[Tuple[bytes, int, int, str, bool]], int]]:
+        """Render tiles, returning each for the writer with the bytes to release once it is written"""
+        rendered = await self.render_pool.run(
+            rendering.render_tiles, [[(page.data, y0, y1) for page, y0, y1 in segments] for segments in batch], width,
+            self.watermark_text, DEFAULT_STYLE, profile.quality, profile.max_width
+        )
+        results = []
+        for segments, tile in zip(batch, rendered):
+            # Pages ending in this tile are no longer needed after it
+            held = sum(len(page.data) for page, _, y1 in segments if y1 == page.strip_height)
+            info = probe_jpeg(tile) if tile else None
+            if not info:
+                results.append((None, held))
+                continue
+            gauge.hold(len(tile))
+            gauge.reencoded += 1
+            results.append(((tile, *info, False), held + len(tile)))
+        return results
+
+    def _record_build(self, profile: RenderProfile, pages: int, peak_bytes: int, seconds: float, size: int):
+        self.build_stats['builds'] += 1
+        self.build_stats['pages'] += pages
+        self.build_stats['last_peak_bytes'] = peak_bytes
+        self.build_stats['peak_bytes'] = max(self.build_stats['peak_bytes'], peak_bytes)
+        name = 'cbz' if profile.output_format == 'cbz' else profile.name
+        stats = self.profile_stats.setdefault(name, {'builds': 0, 'pages': 0, 'seconds': 0.0, 'bytes': 0})
+        stats['builds'] += 1
+        stats['pages'] += pages
+        stats['seconds'] += seconds
+        stats['bytes'] += size
+
+    async def optimize_image(self, image_path: str, max_width: int = 1200) -> str:
         """Optimize image size and quality"""
         try:
-            with Image.open(image_path) as img:
-                # Convert to RGB if necessary
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Resize if too large
-                width, height = img.size
-                if width > max_width:
-                    ratio = max_width / width
-                    new_height = int(height * ratio)
-                    img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Save optimized image
-                optimized_path = image_path.replace('.jpg', '_opt.jpg')
-                img.save(optimized_path, 'JPEG', quality=85, optimize=True)
-                
-                # Replace original
-                os.remove(image_path)
-                os.rename(optimized_path, image_path)
-                
-                return image_path
+            async with aiofiles.open(image_path, 'rb') as f:
+                image_data = await f.read()
+            optimized = await self.render_pool.run(rendering.optimize_image, image_data, max_width)
+
+            # Replace original
+            async with aiofiles.open(image_path, 'wb') as f:
+                await f.write(optimized)
+            return image_path
         
         except Exception as e:
             logger.error(f"Error optimizing image {image_path}: {e}")
@@ -0,0 +1,139 @@
+import io
+import logging
+from typing import BinaryIO, List, Optional, Tuple
+
+from PIL import Image
+
+from watermark import DEFAULT_STYLE, WatermarkStyle
+
+logger = logging.getLogger(__name__)
+
+# PDF viewers refuse pages longer than 200 inches; taller pages are scaled down to fit
+MAX_PAGE_UNITS = 14400
+
+COLOR_SPACES = {'L': '/DeviceGray', 'RGB': '/DeviceRGB'}
+
+# Helvetica advance widths (per 1000 units of font size) for ASCII 32-126 in WinAnsiEncoding
+HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+def text_width(text: str, font_size: float) -> float:
+    """Width of text set in Helvetica at font_size"""
+    units = sum(HELVETICA_WIDTHS[ord(c) - 32] if 32 <= ord(c) < 127 else 556 for c in text)
+    return units * font_size / 1000
+
+def pdf_string(text: str) -> bytes:
+    data = text.encode('cp1252', errors='replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+def probe_jpeg(image_data: bytes) -> Optional[Tuple[int, int, str]]:
+    """Size and colour mode of a JPEG a PDF can embed as it is, or None
+
+    Only the header is read; the pixels are never decoded.
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            # CMYK JPEGs need Adobe-specific decode arrays; let those be re-rendered
+            if img.format == 'JPEG' and img.mode in COLOR_SPACES:
+                return img.width, img.height, img.mode
+    except Exception:
+        pass
+    return None
+
+class ImagePdfWriter:
+    """Writes a PDF of full-page JPEG images to a stream, one page at a time.
+
+    The JPEG bytes are stored unchanged (DCTDecode). The watermark is drawn as a
+    transparent Helvetica text layer over each page instead of into the pixels, so
+    pages are never decoded or re-encoded.
+    """
+    def __init__(self, stream: BinaryIO, watermark_text: Optional[str] = None,
+                 style: WatermarkStyle = DEFAULT_STYLE):
+        self.stream = stream
+        self.watermark_text = watermark_text
+        self.style = style
+        self.offsets: List[int] = []
+        self.page_ids: List[int] = []
+        self.position = 0
+        # Shared objects are numbered up front and written by close()
+        self.catalog_id = self._reserve()
+        self.pages_id = self._reserve()
+        self.font_id = self._reserve()
+        self.alpha_id = self._reserve()
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _reserve(self) -> int:
+        self.offsets.append(0)
+        return len(self.offsets)
+
+    def _write(self, data: bytes):
+        self.stream.write(data)
+        self.position += len(data)
+
+    def _object(self, object_id: int, body: bytes, stream: Optional[bytes] = None):
+        self.offsets[object_id - 1] = self.position
+        self._write(b'%d 0 obj\n' % object_id)
+        if stream is None:
+            self._write(body + b'\nendobj\n')
+            return
+        self._write(body[:-2] + b' /Length %d >>\nstream\n' % len(stream))
+        self._write(stream)
+        self._write(b'\nendstream\nendobj\n')
+
+    def add_page(self, image_data: bytes, width: int, height: int, mode: str, watermark: bool = True):
+        """Append a page showing a JPEG as it is, with the text watermark layer unless watermark is False"""
+        scale = min(1.0, MAX_PAGE_UNITS / max(width, height))
+        page_width, page_height = width * scale, height * scale
+
+        image_id = self._reserve()
+        self._object(image_id, b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s '
+                     b'/BitsPerComponent 8 /Filter /DCTDecode >>' % (width, height, COLOR_SPACES[mode].encode()),
+                     image_data)
+
+        content = b'q %.2f 0 0 %.2f 0 0 cm /Im%d Do Q\n' % (page_width, page_height, image_id)
+        if watermark and self.watermark_text:
+            content += self._watermark_content(page_width, page_height)
+        content_id = self._reserve()
+        self._object(content_id, b'<< >>', content)
+
+        page_id = self._reserve()
+        self._object(page_id, b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] '
+                     b'/Resources << /Font << /WM %d 0 R >> /ExtGState << /WMA %d 0 R >> '
+                     b'/XObject << /Im%d %d 0 R >> >> /Contents %d 0 R >>'
+                     % (self.pages_id, page_width, page_height, self.font_id, self.alpha_id,
+                        image_id, image_id, content_id))
+        self.page_ids.append(page_id)
+
+    def _watermark_content(self, page_width: float, page_height: float) -> bytes:
+        # Same placement as the pixel watermark: bottom right corner, sized by page height
+        font_size = max(1.0, page_height * self.style.font_ratio)
+        x = page_width - text_width(self.watermark_text, font_size) - page_width * self.style.padding_ratio
+        y = page_height * self.style.padding_ratio
+        red, green, blue, _ = (channel / 255 for channel in self.style.fill)
+        return (b'q /WMA gs %.3f %.3f %.3f rg BT /WM %.2f Tf %.2f %.2f Td %s Tj ET Q\n'
+                % (red, green, blue, font_size, max(0.0, x), y, pdf_string(self.watermark_text)))
+
+    def abort(self):
+        """Abandon an unfinished PDF; nothing is buffered outside the stream"""
+
+    def close(self):
+        """Write the page tree, shared resources and cross-reference table"""
+        self._object(self.alpha_id, b'<< /Type /ExtGState /ca %.3f >>' % (self.style.fill[3] / 255))
+        self._object(self.font_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                     b'/Encoding /WinAnsiEncoding >>')
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        self._object(self.pages_id, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids)))
+        self._object(self.catalog_id, b'<< /Type /Catalog /Pages %d 0 R >>' % self.pages_id)
+
+        xref_offset = self.position
+        self._write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(self.offsets) + 1))
+        for offset in self.offsets:
+            self._write(b'%010d 00000 n \n' % offset)
+        self._write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                    % (len(self.offsets) + 1, self.catalog_id, xref_offset))
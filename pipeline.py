@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Stage = Tuple[str, Callable[[Any], Awaitable[None]]]
+
+class Pipeline:
+    """Staged pipeline with one worker per stage and small bounded queues between stages.
+
+    Items move through every stage in input order, so the last stage sees them in order
+    while earlier stages already work on the items behind. A stage that raises marks the
+    item failed; later stages except the last are skipped for it.
+    """
+    def __init__(self, stages: Sequence[Stage], queue_size: int = 1,
+                 discard: Optional[Callable[[Any], None]] = None):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.discard = discard
+        self.busy: Dict[str, float] = {name: 0.0 for name, _ in self.stages}
+        self.duration = 0.0
+
+    async def run(self, items: List[Any]):
+        """Push items through all stages, returning when the last stage has handled them all"""
+        started = time.monotonic()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        failed = set()
+        finished = set()
+        last = len(self.stages) - 1
+
+        async def feed():
+            for item in items:
+                await queues[0].put(item)
+            await queues[0].put(None)
+
+        async def worker(index: int):
+            name, handle = self.stages[index]
+            while True:
+                item = await queues[index].get()
+                if item is not None and (index == last or id(item) not in failed):
+                    stage_started = time.monotonic()
+                    try:
+                        await handle(item)
+                    except Exception as e:
+                        logger.error(f"Pipeline stage {name} failed: {e}")
+                        failed.add(id(item))
+                    self.busy[name] += time.monotonic() - stage_started
+                if index == last:
+                    if item is None:
+                        return
+                    finished.add(id(item))
+                else:
+                    await queues[index + 1].put(item)
+                    if item is None:
+                        return
+
+        tasks = [asyncio.ensure_future(feed())] + [asyncio.ensure_future(worker(i)) for i in range(len(self.stages))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.discard:
+                # Release whatever items picked up but never delivered
+                for item in items:
+                    if id(item) not in finished:
+                        self.discard(item)
+            raise
+        finally:
+            self.duration = time.monotonic() - started
+        logger.info(self.summary())
+
+    def summary(self) -> str:
+        """Wall time against time spent per stage; the difference is what overlapping saved"""
+        stage_times = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.busy.items())
+        saved = max(0.0, sum(self.busy.values()) - self.duration)
+        return f"Pipeline took {self.duration:.1f}s ({stage_times}; overlap saved {saved:.1f}s)"
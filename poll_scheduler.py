@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import statistics
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Same format as SQLite's CURRENT_TIMESTAMP, so stored times compare as strings
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Chapters first seen closer together than this belong to one release
+RELEASE_BURST = timedelta(hours=1)
+
+def format_timestamp(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+def parse_timestamp(value: str) -> datetime:
+    return datetime.strptime(value, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+
+class PollScheduler:
+    """Background loop that checks each series when it is due, adapting intervals to release cadence"""
+    def __init__(self, db, check: Callable[[list], Awaitable], base_interval: float = 6,
+                 min_interval: float = 1, max_interval: float = 72, tick_seconds: float = 60):
+        self.db = db
+        self.check = check
+        self.base_interval = timedelta(hours=base_interval)
+        self.min_interval = timedelta(hours=min_interval)
+        self.max_interval = timedelta(hours=max_interval)
+        self.tick_seconds = tick_seconds
+        self.stats = {'ticks': 0, 'sweeps': 0, 'series_checked': 0, 'errors': 0}
+
+    @classmethod
+    def from_config(cls, db, check, config) -> 'PollScheduler':
+        """Build a scheduler from UPDATE_INTERVAL_HOURS and the POLL_* settings in Config"""
+        return cls(
+            db,
+            check,
+            base_interval=config.UPDATE_INTERVAL_HOURS,
+            min_interval=config.POLL_MIN_INTERVAL_HOURS,
+            max_interval=config.POLL_MAX_INTERVAL_HOURS,
+            tick_seconds=config.POLL_TICK_SECONDS,
+        )
+
+    async def run(self):
+        """Check due series forever; cancel the task to stop"""
+        logger.info("Poll scheduler started")
+        while True:
+            self.stats['ticks'] += 1
+            try:
+                due = self.db.get_all_series(due_at=format_timestamp(datetime.now(timezone.utc)))
+                if due:
+                    logger.info(f"{len(due)} series due for an update check")
+                    self.stats['sweeps'] += 1
+                    self.stats['series_checked'] += len(due)
+                    await self.check(due)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error in scheduled update check: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+    def reschedule(self, series_list: list):
+        """Set the next check time of each series from its release history"""
+        now = datetime.now(timezone.utc)
+        for series in series_list:
+            releases = [parse_timestamp(value) for value in self.db.get_release_times(series.url)]
+            next_check = now + self.next_interval(releases, now)
+            self.db.set_next_check(series.id, format_timestamp(now), format_timestamp(next_check))
+
+    def next_interval(self, releases: List[datetime], now: datetime) -> timedelta:
+        """Pick the wait before the next check from the times chapters were first seen"""
+        cadence = self.release_cadence(releases)
+        if cadence is None:
+            return self.base_interval
+        last_release = releases[-1]
+        silence = now - last_release
+        if silence > cadence * 2:
+            # Dormant: back off in proportion to how long the title has been quiet
+            return self._clamp(silence / 4)
+        # Poll often inside the window around the expected release, sleep until it otherwise
+        window = max(self.min_interval, cadence / 10)
+        window_opens = last_release + cadence - window
+        if now >= window_opens:
+            return self.min_interval
+        return self._clamp(window_opens - now)
+
+    @staticmethod
+    def release_cadence(releases: List[datetime]) -> Optional[timedelta]:
+        """Median gap between releases, ignoring chapters that arrived in one burst"""
+        gaps = [later - earlier for earlier, later in zip(releases, releases[1:]) if later - earlier >= RELEASE_BURST]
+        if len(gaps) < 2:
+            return None
+        return timedelta(seconds=statistics.median(gap.total_seconds() for gap in gaps))
+
+    def _clamp(self, interval: timedelta) -> timedelta:
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def get_stats(self) -> Dict:
+        """Get loop counters and the next scheduled check"""
+        stats = dict(self.stats)
+        stats['next_check_at'] = self.db.get_next_check_at()
+        return stats
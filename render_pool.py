@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class RenderPool:
+    """Runs CPU-bound rendering functions (bytes in, bytes out) in recycled worker processes.
+
+    With zero workers the functions run in a thread instead, which keeps the event loop
+    free but shares one core.
+    """
+    def __init__(self, workers: int = 2, max_tasks_per_child: Optional[int] = 50):
+        self.workers = max(0, workers)
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_tasks = 0
+        self.stats = {'tasks': 0, 'failures': 0, 'restarts': 0, 'recycles': 0, 'seconds': 0.0}
+
+    @classmethod
+    def from_config(cls, config) -> 'RenderPool':
+        """Build a pool from the RENDER_* settings in Config"""
+        return cls(config.RENDER_WORKERS, config.RENDER_MAX_TASKS_PER_CHILD)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Recycle the whole pool after about max_tasks_per_child tasks per worker so memory
+        # held by long-lived workers is returned. ProcessPoolExecutor's own
+        # max_tasks_per_child can deadlock on Python 3.11, so generations are swapped here.
+        if (self._executor is not None and self.max_tasks_per_child
+                and self._executor_tasks >= self.workers * self.max_tasks_per_child):
+            # Tasks already submitted finish before the old workers exit
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self.stats['recycles'] += 1
+        if self._executor is None:
+            # Spawned workers start clean instead of inheriting the bot's threads and sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            self._executor_tasks = 0
+            logger.info(f"Started render pool with {self.workers} processes")
+        self._executor_tasks += 1
+        return self._executor
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run a module-level function with picklable arguments off the event loop"""
+        self.stats['tasks'] += 1
+        started = time.monotonic()
+        try:
+            if self.workers == 0:
+                return await asyncio.to_thread(func, *args)
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                # A worker died mid-task (e.g. killed for memory); start a fresh pool and retry once.
+                # Every task in flight sees the same break: only the first replaces the pool, the
+                # rest retry on the one it started.
+                if self._executor is executor:
+                    logger.warning("Render pool broken, restarting it")
+                    self.stats['restarts'] += 1
+                    self._reset()
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+        except Exception:
+            self.stats['failures'] += 1
+            raise
+        finally:
+            self.stats['seconds'] += time.monotonic() - started
+
+    async def map(self, func: Callable, items: List, *args) -> List:
+        """Run func(item, *args) for every item in parallel, keeping input order"""
+        return await asyncio.gather(*(self.run(func, item, *args) for item in items))
+
+    def _reset(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self._reset()
+
+    def get_stats(self) -> Dict:
+        """Get task counters and pool size"""
+        stats = dict(self.stats)
+        stats['workers'] = self.workers
+        stats['mode'] = 'processes' if self.workers else 'thread'
+        stats['avg_ms'] = round(stats['seconds'] * 1000 / stats['tasks'], 1) if stats['tasks'] else 0.0
+        return stats
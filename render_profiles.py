@@ -0,0 +1,23 @@
+from typing import Dict, NamedTuple, Optional
+
+class RenderProfile(NamedTuple):
+    """How chapter pages are sized and encoded before they are sent"""
+    name: str
+    max_width: int  # pages wider than this are scaled down; 0 keeps the source width
+    quality: int  # JPEG quality of re-encoded pages
+    passthrough: bool  # embed source JPEGs that need no scaling without re-encoding them
+    page_aspect: float = 0.0  # re-cut the strip into pages this many times taller than wide; 0 keeps pages
+    description: str = ""
+    output_format: str = 'pdf'  # pdf, or cbz: original images in a zip, the profile's sizing unused
+
+PROFILES: Dict[str, RenderProfile] = {
+    'mobile': RenderProfile('mobile', 720, 70, False, 2.0, "720px wide, screen-sized pages and small files for phones"),
+    'standard': RenderProfile('standard', 1200, 85, False, 2.0, "1200px wide, screen-sized pages, good quality at a moderate size"),
+    'archive': RenderProfile('archive', 0, 95, True, 0.0, "source resolution, original pages kept as they are"),
+}
+
+OUTPUT_FORMATS = ('pdf', 'cbz')
+
+def find_profile(name: Optional[str]) -> Optional[RenderProfile]:
+    """Look up a profile by name, ignoring case; None if there is no such profile"""
+    return PROFILES.get(name.strip().lower()) if name else None
@@ -0,0 +1,181 @@
+import io
+import logging
+from typing import List, Optional, Tuple
+
+import img2pdf
+from PIL import Image
+from PyPDF2 import PdfReader, PdfWriter
+
+from watermark import DEFAULT_STYLE, WatermarkStyle, apply_watermark
+
+logger = logging.getLogger(__name__)
+
+# CPU-bound rendering, run in worker processes by RenderPool: plain functions taking and
+# returning bytes. Keep this module free of bot, database and event loop state.
+
+# Grey levels squared, scaled back to 0-255, for the row variance scan
+SQUARES = [value * value // 255 for value in range(256)]
+
+def open_page(img: Image.Image, max_width: int = 0, flatten_alpha: bool = False) -> Image.Image:
+    """Decode an opened page as RGB, no wider than max_width (0 keeps the source width)
+
+    JPEGs that are scaled down are decoded at 1/2, 1/4 or 1/8 scale straight from the file
+    (draft mode), so the full resolution image is never built. Other formats are halved
+    with reduce() before the final resample.
+    """
+    target = None
+    if max_width and img.width > max_width:
+        target = (max_width, max(1, round(img.height * max_width / img.width)))
+        img.draft('RGB', target)
+
+    if flatten_alpha and img.mode in ('RGBA', 'LA'):
+        # Transparent areas become white rather than black
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    else:
+        img = img.copy()
+
+    if target and img.size != target:
+        img = img.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return img
+
+def watermark_page(image_data: bytes, text: str, style: WatermarkStyle = DEFAULT_STYLE,
+                   output_format: str = 'JPEG', quality: int = 95, flatten_alpha: bool = False,
+                   optimize: bool = False, max_width: int = 0) -> Optional[bytes]:
+    """Blend the watermark into the bottom right corner of a page image and re-encode it"""
+    try:
+        # Process image in memory
+        with Image.open(io.BytesIO(image_data)) as source:
+            img = open_page(source, max_width, flatten_alpha)
+            apply_watermark(img, text, style)
+
+            # Save to bytes buffer
+            output_buffer = io.BytesIO()
+            img.save(output_buffer, format=output_format, quality=quality, optimize=optimize)
+            return output_buffer.getvalue()
+
+    except Exception as e:
+        logger.error(f"Error processing page image: {e}")
+        return None
+
+def reencode_page(image_data: bytes, quality: int = 95) -> Optional[bytes]:
+    """Re-encode a page Pillow can read but a comic reader might not (BMP, TIFF...) as a JPEG"""
+    try:
+        with Image.open(io.BytesIO(image_data)) as source:
+            img = open_page(source, flatten_alpha=True)
+            output_buffer = io.BytesIO()
+            img.save(output_buffer, format='JPEG', quality=quality)
+            return output_buffer.getvalue()
+    except Exception as e:
+        logger.error(f"Error re-encoding page image: {e}")
+        return None
+
+def scan_rows(image_data: bytes, max_width: int = 0) -> Optional[Tuple[int, int, List[int]]]:
+    """Size of a page once scaled to max_width, and the brightness variance of each of its rows
+
+    The variance comes from two box-filtered resizes to a single column (of the grey image
+    and of its squares), so the scan stays in Pillow's C code. JPEGs are decoded in grey
+    at reduced scale.
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            width, height = img.size
+            if max_width and width > max_width:
+                width, height = max_width, max(1, round(height * max_width / width))
+            img.draft('L', (width, height))
+            grey = img.convert('L')
+            means = grey.resize((1, height), Image.Resampling.BOX).getdata()
+            squares = grey.point(SQUARES).resize((1, height), Image.Resampling.BOX).getdata()
+            return width, height, [max(0, square * 255 - mean * mean) for mean, square in zip(means, squares)]
+    except Exception as e:
+        logger.error(f"Error scanning page image: {e}")
+        return None
+
+def strip_height(size: Tuple[int, int], width: int, max_width: int = 0) -> int:
+    """Height of a page in strip rows: scaled to max_width, then to the strip width, as StripTiler counts"""
+    page_width, page_height = size
+    if max_width and page_width > max_width:
+        page_width, page_height = max_width, max(1, round(page_height * max_width / page_width))
+    return max(1, round(page_height * width / page_width))
+
+def decode_strip_page(image_data: bytes, width: int, max_width: int = 0) -> Tuple[Image.Image, int]:
+    """Decode a page as RGB, JPEGs at the smallest draft scale still covering the strip width
+
+    Returns the image with the page's height in strip rows; strip row y sits at image row
+    y * image.height / rows.
+    """
+    with Image.open(io.BytesIO(image_data)) as source:
+        rows = strip_height(source.size, width, max_width)
+        source.draft('RGB', (width, rows))
+        img = open_page(source, flatten_alpha=True)
+    return img, rows
+
+def render_tiles(tiles: List[List[Tuple[bytes, int, int]]], width: int, text: str,
+                 style: WatermarkStyle = DEFAULT_STYLE, quality: int = 95, max_width: int = 0) -> List[Optional[bytes]]:
+    """Stitch row ranges of pages into watermarked JPEG tiles width pixels wide, None for failed tiles
+
+    Rows are counted after each page is scaled to max_width and then to width, as scan_rows
+    and StripTiler measured them. Each page is decoded once per call however many tiles it
+    spans, and a tile only resamples the source rows it shows.
+    """
+    pages = {}  # id(image_data) -> (decoded page, its height in strip rows)
+    try:
+        return [_render_tile(segments, width, text, style, quality, max_width, pages) for segments in tiles]
+    finally:
+        for img, _ in pages.values():
+            img.close()
+
+def _render_tile(segments: List[Tuple[bytes, int, int]], width: int, text: str, style: WatermarkStyle,
+                 quality: int, max_width: int, pages: dict) -> Optional[bytes]:
+    try:
+        parts = []
+        for image_data, y0, y1 in segments:
+            if id(image_data) not in pages:
+                pages[id(image_data)] = decode_strip_page(image_data, width, max_width)
+            img, rows = pages[id(image_data)]
+            scale = img.height / rows
+            parts.append(img.resize((width, y1 - y0), Image.Resampling.LANCZOS,
+                                    box=(0, y0 * scale, img.width, y1 * scale)))
+            if y1 == rows:
+                # Tiles come in strip order, so a page is done once its last row is used
+                pages.pop(id(image_data))[0].close()
+        tile = Image.new('RGB', (width, sum(part.height for part in parts)), (255, 255, 255))
+        top = 0
+        for part in parts:
+            tile.paste(part, (0, top))
+            top += part.height
+        apply_watermark(tile, text, style)
+
+        output_buffer = io.BytesIO()
+        tile.save(output_buffer, format='JPEG', quality=quality)
+        return output_buffer.getvalue()
+    except Exception as e:
+        logger.error(f"Error rendering tile: {e}")
+        return None
+
+def assemble_pdf(pages: List[bytes]) -> bytes:
+    """Wrap encoded page images into a PDF, one page per image"""
+    return img2pdf.convert(pages)
+
+def compress_pdf(pdf_data: bytes) -> bytes:
+    """Rewrite a PDF through PyPDF2, keeping its metadata"""
+    reader = PdfReader(io.BytesIO(pdf_data))
+    writer = PdfWriter()
+    for page in reader.pages:
+        writer.add_page(page)
+    if reader.metadata:
+        writer.add_metadata(reader.metadata)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+def optimize_image(image_data: bytes, max_width: int = 1200) -> bytes:
+    """Downscale an image to max_width and re-encode it as an optimized JPEG"""
+    with Image.open(io.BytesIO(image_data)) as source:
+        img = open_page(source, max_width)
+        output = io.BytesIO()
+        img.save(output, 'JPEG', quality=85, optimize=True)
+        return output.getvalue()
@@ -0,0 +1,119 @@
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for idempotent GET requests"""
+    RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0,
+                 max_retry_after: float = 60.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    @classmethod
+    def from_config(cls, config) -> 'RetryPolicy':
+        """Build a policy from the RETRY_* settings in Config"""
+        return cls(
+            max_attempts=config.RETRY_MAX_ATTEMPTS,
+            base_delay=config.RETRY_BASE_DELAY,
+            max_delay=config.RETRY_MAX_DELAY,
+        )
+
+    def should_retry_status(self, status: int) -> bool:
+        """Check whether an HTTP status is worth retrying"""
+        return status in self.RETRY_STATUSES
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Get the delay before the next attempt, honouring Retry-After when sent"""
+        server_delay = self.parse_retry_after(retry_after)
+        if server_delay is not None:
+            return min(server_delay, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse a Retry-After header given in seconds or as an HTTP date"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class CircuitBreaker:
+    """Per-site breaker that fails fast while a site is down and probes it half-open"""
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.probe_started_at = 0.0
+        self.stats = {'opened': 0, 'rejected': 0}
+
+    @classmethod
+    def from_config(cls, name: str, config) -> 'CircuitBreaker':
+        """Build a breaker from the BREAKER_* settings in Config"""
+        return cls(name, failure_threshold=config.BREAKER_FAILURE_THRESHOLD, reset_timeout=config.BREAKER_RESET_SECONDS)
+
+    def allow_request(self) -> bool:
+        """Check whether a request may go out now"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.stats['rejected'] += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+            logger.info(f"Circuit for {self.name} half-open, probing")
+        if self.state == self.HALF_OPEN:
+            # A probe that never reported back stops blocking the site after reset_timeout
+            if self.probe_in_flight and time.monotonic() - self.probe_started_at < self.reset_timeout:
+                self.stats['rejected'] += 1
+                return False
+            self.probe_in_flight = True
+            self.probe_started_at = time.monotonic()
+        return True
+
+    def release_probe(self):
+        """Let another request probe after one ended without a verdict, e.g. cancelled"""
+        self.probe_in_flight = False
+
+    def record_success(self):
+        """Close the circuit after a healthy response"""
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold or on a failed probe"""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.stats['opened'] += 1
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+
+    def get_stats(self) -> Dict:
+        """Get breaker state and counters"""
+        return {'state': self.state, 'failures': self.failures, **self.stats}
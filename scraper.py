@@ -2,10 +2,20 @@ import asyncio
 import aiohttp
 import re
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 from typing import List, Dict, Optional
 import logging
 from sites.manhwaclan import ManhwaClanScraper
+from base_scraper import normalize_chapter_number
+from config import Config
+from database import ManhwaDB
+from conditional_cache import ConditionalCache, NOT_MODIFIED
+from resilience import RetryPolicy, CircuitBreaker
+from html_parser import HtmlParser
+from ttl_cache import TTLCache
+from singleflight import SingleFlight
+from http_client import HttpClient
+from download_scheduler import DownloadScheduler, PRIORITY_BACKGROUND
 # from sites.asurascans import AsuraScansScraper # Commented out for now
 # from sites.flamescans import FlameScansScraper # Commented out for now
 import os
@@ -13,37 +23,113 @@ import os
 logger = logging.getLogger(__name__)
 
 class ManhwaScraperManager:
-    def __init__(self):
+    def __init__(self, config: Optional[Config] = None, db: Optional[ManhwaDB] = None):
+        self.config = config or Config()
+        self.db = db or ManhwaDB(self.config.DATABASE_PATH)
         self.scrapers = {
             'manhwaclan.com': ManhwaClanScraper(),
             # 'asurascans.com': AsuraScansScraper(), # Add back when ready
             # 'flamescans.org': FlameScansScraper(), # Add back when ready
         }
-        self.session = None
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        # Pooled client shared with the PDF builder and the bot
+        self.http = HttpClient.from_config(self.config)
+        self.downloads = DownloadScheduler.from_config(self.http, self.config)
+        # Persisted validators let update checks skip unchanged series pages
+        self.conditional_cache = ConditionalCache(self.db)
+        self.retry_policy = RetryPolicy.from_config(self.config)
+        # One breaker per supported domain so an outage fails fast for that site only
+        self.circuit_breakers = {
+            domain: CircuitBreaker.from_config(domain, self.config)
+            for domain in self.scrapers
         }
+        self.html_parser = HtmlParser(self.config.HTML_PARSER)
+        for domain, scraper in self.scrapers.items():
+            scraper.html_parser = self.html_parser
+            scraper.conditional_cache = self.conditional_cache
+            scraper.retry_policy = self.retry_policy
+            scraper.circuit_breaker = self.circuit_breakers[domain]
+        # Parsed results shared by /fetch, search, /latest and update checks
+        self.cache = TTLCache(
+            max_entries=self.config.CACHE_MAX_ENTRIES,
+            ttls={
+                'chapters': self.config.CACHE_TTL_CHAPTERS,
+                'images': self.config.CACHE_TTL_IMAGES,
+                'info': self.config.CACHE_TTL_INFO,
+            }
+        )
+        # Identical scrapes already in flight are awaited instead of repeated
+        self.flights = SingleFlight('scrape')
 
-    async def get_session(self):
-        """Get or create aiohttp session"""
-        if not self.session:
-            self.session = aiohttp.ClientSession(
-                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-            )
-        return self.session
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get the shared pooled aiohttp session"""
+        return await self.http.get_session()
 
     async def close_session(self):
-        """Close aiohttp session"""
-        if self.session:
-            await self.session.close()
-            self.session = None
+        """Close the shared aiohttp session"""
+        await self.http.close()
 
-    def get_scraper(self, url: str):
-        """Get appropriate scraper for URL"""
+    @staticmethod
+    def get_domain(url: str) -> str:
+        """Get the normalized site domain of a URL"""
         domain = urlparse(url).netloc.lower()
         # Remove www. prefix if present
-        domain = domain.replace('www.', '')
-        return self.scrapers.get(domain)
+        return domain.replace('www.', '')
+
+    def get_scraper(self, url: str):
+        """Get appropriate scraper for URL"""
+        return self.scrapers.get(self.get_domain(url))
+
+    async def get_manhwa_info(self, url: str) -> Optional[Dict]:
+        """Get manhwa information, served from the cache when fresh"""
+        cached = self.cache.get('info', url)
+        if cached is not None:
+            return dict(cached)
+        scraper = self.get_scraper(url)
+        if not scraper:
+            return None
+        session = await self.get_session()
+        info = await scraper.get_manhwa_info(session, url)
+        if info:
+            self.cache.set('info', url, info)
+            return dict(info)
+        return info
+
+    async def get_latest_chapters(self, url: str, fresh: bool = False) -> List[Dict]:
+        """Get a series' chapter list, served from the cache unless fresh is requested"""
+        if not fresh:
+            cached = self.cache.get('chapters', url)
+            if cached is not None:
+                return list(cached)
+        scraper = self.get_scraper(url)
+        if not scraper:
+            return []
+
+        async def scrape():
+            session = await self.get_session()
+            chapters = await scraper.get_latest_chapters(session, url)
+            if chapters:
+                self.cache.set('chapters', url, chapters)
+            return chapters
+
+        return list(await self.flights.do(('chapters', url), scrape))
+
+    async def get_chapter_images(self, chapter_url: str) -> List[str]:
+        """Get a chapter's image URLs, served from the cache when fresh"""
+        cached = self.cache.get('images', chapter_url)
+        if cached is not None:
+            return list(cached)
+        scraper = self.get_scraper(chapter_url)
+        if not scraper:
+            return []
+
+        async def scrape():
+            session = await self.get_session()
+            images = await scraper.get_chapter_images(session, chapter_url)
+            if images:
+                self.cache.set('images', chapter_url, images)
+            return images
+
+        return list(await self.flights.do(('images', chapter_url), scrape))
 
     async def add_manhwa(self, url: str) -> Dict:
         """Add manhwa and get basic info"""
@@ -51,8 +137,7 @@ class ManhwaScraperManager:
             scraper = self.get_scraper(url)
             if not scraper:
                 return {'success': False, 'error': 'Unsupported site'}
-            session = await self.get_session()
-            info = await scraper.get_manhwa_info(session, url)
+            info = await self.get_manhwa_info(url)
             if info:
                 return {
                     'success': True,
@@ -74,40 +159,97 @@ class ManhwaScraperManager:
             if not scraper:
                 return []
             session = await self.get_session()
-            chapters = await scraper.get_latest_chapters(session, manhwa.url)
-            # Filter new chapters
-            new_chapters = []
-            for chapter in chapters:
-                if chapter['url'] != manhwa.last_chapter_url:
-                    new_chapters.append(chapter)
-                else:
-                    break # Found the last read chapter
-            return new_chapters
+            html = await scraper.fetch_html(
+                session, manhwa.url, conditional=True, until=scraper.CHAPTER_LIST_STREAM_TARGETS
+            )
+            if html is NOT_MODIFIED:
+                logger.info(f"{manhwa.name} unchanged since last check, skipping parse")
+                return []
+            if not html:
+                return []
+            chapters = scraper.parse_chapter_list(html)
+            if chapters:
+                # A fresh parse is the best chapter list we have; share it
+                self.cache.set('chapters', manhwa.url, chapters)
+            return self.find_new_chapters(manhwa, chapters)
         except Exception as e:
             logger.error(f"Error checking chapters for {manhwa.name}: {e}")
             return []
 
-    async def download_chapter_images(self, chapter_url: str, site_name: str) -> List[str]:
+    def find_new_chapters(self, manhwa, chapters: List[Dict]) -> List[Dict]:
+        """Diff a scraped chapter list against the series' persisted chapter index"""
+        for chapter in chapters:
+            chapter['number'] = normalize_chapter_number(chapter['name'], chapter['url'])
+        known_urls, known_numbers = self.db.get_known_chapters(manhwa.url)
+
+        if not known_urls:
+            # First indexed check: everything up to the last delivered chapter is already known
+            baseline = normalize_chapter_number(manhwa.last_chapter_name, manhwa.last_chapter_url)
+            if baseline is None:
+                seen, new_chapters = chapters, []
+            else:
+                seen = [c for c in chapters if c['number'] is None or c['number'] <= baseline]
+                new_chapters = [c for c in chapters if c['number'] is not None and c['number'] > baseline]
+            self.db.add_known_chapters(manhwa.url, seen)
+            logger.info(f"Indexed {len(seen)} known chapters for {manhwa.name}")
+        else:
+            # A chapter counts as known by URL. Its number only stands in when the URL really
+            # changed: no scraped URL is indexed (the site moved everything), or the indexed
+            # chapter with that number has vanished from the list. Side stories and new
+            # seasons reuse numbers, so a number alone would hide real new chapters.
+            scraped_urls = {c['url'] for c in chapters}
+            urls_moved = not scraped_urls & known_urls
+
+            def known_by_number(chapter) -> bool:
+                urls = known_numbers.get(chapter['number'])
+                return bool(urls) and (urls_moved or not urls & scraped_urls)
+
+            new_chapters = [
+                c for c in chapters
+                if c['url'] not in known_urls and not known_by_number(c)
+            ]
+
+        new_chapters.sort(key=lambda c: c['number'] if c['number'] is not None else float('inf'))
+        if new_chapters:
+            logger.info(f"{len(new_chapters)} new chapters for {manhwa.name}")
+        return new_chapters
+
+    def mark_chapters_known(self, series_url: str, chapters: List[Dict]):
+        """Record delivered chapters in the series' chapter index"""
+        for chapter in chapters:
+            if 'number' not in chapter:
+                chapter['number'] = normalize_chapter_number(chapter['name'], chapter['url'])
+        self.db.add_known_chapters(series_url, chapters)
+
+    def get_stream_stats(self) -> Dict:
+        """Sum streamed-fetch counters across all scrapers"""
+        totals = {}
+        for scraper in self.scrapers.values():
+            for key, value in scraper.stream_stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def forget_validators(self, url: str):
+        """Force the next update check of a series page to be processed in full"""
+        self.conditional_cache.invalidate(url)
+
+    async def download_chapter_images(self, chapter_url: str, site_name: str, priority: int = PRIORITY_BACKGROUND) -> List[str]:
         """Download all images from a chapter"""
         try:
             scraper = self.get_scraper(chapter_url)
             if not scraper:
                 return []
-            session = await self.get_session()
-            images = await scraper.get_chapter_images(session, chapter_url)
-            # Download images to temp directory
+            images = await self.get_chapter_images(chapter_url)
+            # Download images to temp directory through the shared scheduler
             downloaded_images = []
-            for i, img_url in enumerate(images):
-                try:
-                    async with session.get(img_url) as response:
-                        if response.status == 200:
-                            content = await response.read()
-                            filename = f"temp/chapter_{i+1:03d}.jpg"
-                            with open(filename, 'wb') as f:
-                                f.write(content)
-                            downloaded_images.append(filename)
-                except Exception as e:
-                    logger.error(f"Error downloading image {img_url}: {e}")
+            contents = await self.downloads.fetch_all(images, priority)
+            for i, content in enumerate(contents):
+                if content is None:
+                    continue
+                filename = f"temp/chapter_{i+1:03d}.jpg"
+                with open(filename, 'wb') as f:
+                    f.write(content)
+                downloaded_images.append(filename)
             return downloaded_images
         except Exception as e:
             logger.error(f"Error downloading chapter images: {e}")
@@ -123,7 +265,9 @@ class ManhwaScraperManager:
                 return []
             
             logger.info(f"Searching for manhwa with query: '{query}'")
-            results = await scraper.search_manhwa(query)
+            session = await self.get_session()
+            key = ('search', ' '.join(query.lower().split()))
+            results = list(await self.flights.do(key, lambda: scraper.search_manhwa(session, query)))
             logger.info(f"Search completed, found {len(results)} results")
             return results
             
@@ -142,33 +286,33 @@ class ManhwaScraperManager:
     async def _get_manhwaclan_chapters(self, url: str) -> List[Dict[str, str]]:
         """Get list of chapters from ManhwaClan"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers) as response:
-                    if response.status != 200:
-                        logger.error(f"Failed to fetch chapters: {response.status}")
-                        return []
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    chapters = []
-                    # Find the chapter list
-                    chapter_list = soup.find('div', class_='chapter-list')
-                    if chapter_list:
-                        for chapter in chapter_list.find_all('a'):
-                            try:
-                                chapter_url = chapter['href']
-                                chapter_name = chapter.text.strip()
-                                chapters.append({
-                                    'name': chapter_name,
-                                    'url': chapter_url
-                                })
-                            except Exception as e:
-                                logger.error(f"Error parsing chapter: {e}")
-                                continue
-                    
-                    return sorted(chapters, key=lambda x: float(re.search(r'\d+', x['name']).group()) if re.search(r'\d+', x['name']) else 0)
-                    
+            session = await self.get_session()
+            async with session.get(url) as response:
+                if response.status != 200:
+                    logger.error(f"Failed to fetch chapters: {response.status}")
+                    return []
+                
+                html = await response.text()
+                soup = self.html_parser.parse(html, SoupStrainer('div', class_='chapter-list'))
+                
+                chapters = []
+                # Find the chapter list
+                chapter_list = soup.find('div', class_='chapter-list')
+                if chapter_list:
+                    for chapter in chapter_list.find_all('a'):
+                        try:
+                            chapter_url = chapter['href']
+                            chapter_name = chapter.text.strip()
+                            chapters.append({
+                                'name': chapter_name,
+                                'url': chapter_url
+                            })
+                        except Exception as e:
+                            logger.error(f"Error parsing chapter: {e}")
+                            continue
+                
+                return sorted(chapters, key=lambda x: float(re.search(r'\d+', x['name']).group()) if re.search(r'\d+', x['name']) else 0)
+                
         except Exception as e:
             logger.error(f"Error getting chapters from ManhwaClan: {e}")
             return []
@@ -176,51 +320,41 @@ class ManhwaScraperManager:
     async def _download_manhwaclan_images(self, url: str) -> List[str]:
         """Download images from ManhwaClan chapter"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers) as response:
-                    if response.status != 200:
-                        logger.error(f"Failed to fetch chapter: {response.status}")
-                        return []
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # Find all images in the chapter
-                    image_urls = []
-                    for img in soup.find_all('img', class_='wp-manga-chapter-img'):
-                        try:
-                            img_url = img['src']
-                            if img_url:
-                                image_urls.append(img_url)
-                        except Exception as e:
-                            logger.error(f"Error parsing image URL: {e}")
-                            continue
+            session = await self.get_session()
+            async with session.get(url) as response:
+                if response.status != 200:
+                    logger.error(f"Failed to fetch chapter: {response.status}")
+                    return []
+                
+                html = await response.text()
+                soup = self.html_parser.parse(html, SoupStrainer('img', class_='wp-manga-chapter-img'))
+                
+                # Find all images in the chapter
+                image_urls = []
+                for img in soup.find_all('img', class_='wp-manga-chapter-img'):
+                    try:
+                        img_url = img['src']
+                        if img_url:
+                            image_urls.append(img_url)
+                    except Exception as e:
+                        logger.error(f"Error parsing image URL: {e}")
+                        continue
 
-                    if not image_urls:
-                        return []
+                if not image_urls:
+                    return []
 
-                    # Download images concurrently
-                    async def download_image(img_url: str, index: int) -> Optional[str]:
-                        try:
-                            async with session.get(img_url, headers=self.headers) as img_response:
-                                if img_response.status == 200:
-                                    img_data = await img_response.read()
-                                    filename = f"temp/chapter_{index+1:03d}.jpg"
-                                    with open(filename, 'wb') as f:
-                                        f.write(img_data)
-                                    return filename
-                        except Exception as e:
-                            logger.error(f"Error downloading image {img_url}: {e}")
-                        return None
-
-                    # Create tasks for concurrent downloads
-                    tasks = [download_image(url, i) for i, url in enumerate(image_urls)]
-                    downloaded_files = await asyncio.gather(*tasks)
-                    
-                    # Filter out None values and sort by filename
-                    return sorted([f for f in downloaded_files if f is not None], 
-                                key=lambda x: int(x.split('_')[1].split('.')[0]))
-                    
+                # Download images through the shared scheduler (results keep page order)
+                downloaded_files = []
+                contents = await self.downloads.fetch_all(image_urls)
+                for index, img_data in enumerate(contents):
+                    if img_data is None:
+                        continue
+                    filename = f"temp/chapter_{index+1:03d}.jpg"
+                    with open(filename, 'wb') as f:
+                        f.write(img_data)
+                    downloaded_files.append(filename)
+                return downloaded_files
+                
         except Exception as e:
             logger.error(f"Error downloading ManhwaClan images: {e}")
             return []
\ No newline at end of file
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key onto one shared in-flight task"""
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {'calls': 0, 'executions': 0, 'coalesced': 0}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func for key, or await the identical call that is already running"""
+        self.stats['calls'] += 1
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            logger.info(f"Coalesced {self.name} call for {key!r}")
+        else:
+            self.stats['executions'] += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        # Shield the shared task so one caller giving up does not cancel it for the rest
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"{self.name} call for {key!r} failed: {task.exception()}")
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Check whether a call for key is currently running"""
+        return key in self._in_flight
+
+    def get_stats(self) -> Dict:
+        """Get call, execution and coalesced counters"""
+        stats = dict(self.stats)
+        stats['in_flight'] = len(self._in_flight)
+        return stats
@@ -1,25 +1,34 @@
 
 import re
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 from urllib.parse import urljoin
 from typing import List, Dict, Optional
 import aiohttp
 import logging
-from scraper import BaseScraper
+from base_scraper import BaseScraper
+from html_stream import StreamTarget
 
 logger = logging.getLogger(__name__)
 
+# Parse filters so each page only builds the subtree it reads
+INFO_STRAINER = SoupStrainer(['h1', 'li'])
+CHAPTER_LIST_STRAINER = SoupStrainer('div', class_='version-chap')
+READING_CONTENT_STRAINER = SoupStrainer('div', class_='reading-content')
+
 class FlameScansScraper(BaseScraper):
+    INFO_STREAM_TARGETS = [StreamTarget('h1', class_='entry-title'), StreamTarget('li', class_='wp-manga-chapter')]
+    CHAPTER_LIST_STREAM_TARGETS = [StreamTarget('div', class_='version-chap')]
+
     def __init__(self):
         super().__init__('flamescans', 'https://flamescans.org')
     
     async def get_manhwa_info(self, session: aiohttp.ClientSession, url: str) -> Optional[Dict]:
         """Get manhwa information from FlameScans"""
-        html = await self.fetch_html(session, url)
+        html = await self.fetch_html(session, url, until=self.INFO_STREAM_TARGETS)
         if not html:
             return None
         
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = self.parse_html(html, INFO_STRAINER)
         
         try:
             # Extract manhwa name
@@ -52,11 +61,14 @@ class FlameScansScraper(BaseScraper):
     
     async def get_latest_chapters(self, session: aiohttp.ClientSession, url: str) -> List[Dict]:
         """Get latest chapters from FlameScans"""
-        html = await self.fetch_html(session, url)
+        html = await self.fetch_html(session, url, until=self.CHAPTER_LIST_STREAM_TARGETS)
         if not html:
             return []
-        
-        soup = BeautifulSoup(html, 'html.parser')
+        return self.parse_chapter_list(html)
+
+    def parse_chapter_list(self, html: str) -> List[Dict]:
+        """Parse the chapter list from a FlameScans series page"""
+        soup = self.parse_html(html, CHAPTER_LIST_STRAINER)
         chapters = []
         
         try:
@@ -91,7 +103,7 @@ class FlameScansScraper(BaseScraper):
         if not html:
             return []
         
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = self.parse_html(html, READING_CONTENT_STRAINER)
         images = []
         
         try:
@@ -0,0 +1,75 @@
+from typing import List, Optional, Sequence, Tuple
+
+class StripPage:
+    """A downloaded page of a vertical strip with the row scores of its scan"""
+    def __init__(self, data: bytes, width: int, height: int, scores: Sequence[int]):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.scores = scores
+        self.strip_height = 0  # height once scaled to the strip width, set by StripTiler
+
+# A run of rows [y0, y1) of a page, in strip coordinates
+Segment = Tuple[StripPage, int, int]
+
+class StripTiler:
+    """Stitches pages of a vertical strip and cuts it into tiles of a target aspect ratio.
+
+    Pages are fed in order and only rows not yet in a tile are buffered, so a chapter is
+    never held whole. Each cut goes at the quietest row (lowest variance, so gutters and
+    blank space) within slack of the target height, the nearest one on ties. A cut is only
+    made once min_tail of the target is buffered past its latest position, so the strip
+    never ends in a sliver of a tile.
+    """
+    def __init__(self, aspect: float, slack: float = 0.25, min_tail: float = 0.25):
+        self.aspect = aspect
+        self.slack = slack
+        self.min_tail = min_tail
+        self.width: Optional[int] = None
+        self.target = 0
+        self.segments: List[Segment] = []
+        self.scores: List[int] = []
+
+    def add(self, page: StripPage) -> List[List[Segment]]:
+        """Append a page to the strip, returning the tiles it completed"""
+        if self.width is None:
+            # The first page sets the strip width; later pages are scaled to match
+            self.width = page.width
+            self.target = max(1, round(self.width * self.aspect))
+        page.strip_height = max(1, round(page.height * self.width / page.width))
+        rows = len(page.scores)
+        if rows == page.strip_height:
+            self.scores.extend(page.scores)
+        else:
+            self.scores.extend(page.scores[min(rows - 1, row * rows // page.strip_height)]
+                               for row in range(page.strip_height))
+        self.segments.append((page, 0, page.strip_height))
+
+        tiles = []
+        while len(self.scores) >= self.target * (1 + self.slack + self.min_tail):
+            tiles.append(self._cut(self._best_cut()))
+        return tiles
+
+    def flush(self) -> List[List[Segment]]:
+        """Return whatever is left of the strip as a last, possibly shorter, tile"""
+        return [self._cut(len(self.scores))] if self.scores else []
+
+    def _best_cut(self) -> int:
+        low = max(1, int(self.target * (1 - self.slack)))
+        high = min(len(self.scores) - 1, int(self.target * (1 + self.slack)))
+        # Coarse score buckets so JPEG noise on blank rows doesn't outweigh distance
+        return min(range(low, high + 1), key=lambda row: (self.scores[row] // 8, abs(row - self.target)))
+
+    def _cut(self, rows: int) -> List[Segment]:
+        tile = []
+        while rows > 0:
+            page, y0, y1 = self.segments[0]
+            take = min(rows, y1 - y0)
+            tile.append((page, y0, y0 + take))
+            if y0 + take == y1:
+                self.segments.pop(0)
+            else:
+                self.segments[0] = (page, y0 + take, y1)
+            rows -= take
+        del self.scores[:sum(y1 - y0 for _, y0, y1 in tile)]
+        return tile
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token bucket: up to capacity calls at once, refilled at rate calls per second"""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token, returning how long to wait before it may be used"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def block(self, seconds: float):
+        """Hold back every caller for seconds, as Telegram asked"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = min(self.tokens, 0)
+
+class TelegramRateLimiter(BaseRequestMiddleware):
+    """Bot session middleware pacing outgoing API calls with global and per-chat token buckets.
+
+    Calls answering TelegramRetryAfter (429) wait the requested time and are retried.
+    """
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1, chat_burst: float = 3,
+                 group_per_minute: float = 20, max_retries: int = 3):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_per_minute / 60
+        self.max_retries = max_retries
+        self._chats: Dict[int, TokenBucket] = {}
+        self.stats = {'calls': 0, 'delayed': 0, 'wait_seconds': 0.0, 'retry_after': 0, 'gave_up': 0}
+
+    @classmethod
+    def from_config(cls, config) -> 'TelegramRateLimiter':
+        """Build a limiter from the TG_* settings in Config"""
+        return cls(
+            global_rate=config.TG_GLOBAL_RATE,
+            chat_rate=config.TG_CHAT_RATE,
+            chat_burst=config.TG_CHAT_BURST,
+            group_per_minute=config.TG_GROUP_PER_MINUTE,
+            max_retries=config.TG_MAX_RETRIES,
+        )
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        # Stored output channels are strings; share one bucket with the numeric id
+        if isinstance(chat_id, str) and chat_id.lstrip('-').isdigit():
+            chat_id = int(chat_id)
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > 10000:
+                self._prune()
+            # Groups and channels have negative ids and a much lower limit
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            else:
+                bucket = TokenBucket(self.group_rate, 1)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _prune(self):
+        """Drop buckets that have refilled completely; they behave like new ones"""
+        now = time.monotonic()
+        for chat_id, bucket in list(self._chats.items()):
+            bucket._refill(now)
+            if bucket.tokens >= bucket.capacity and bucket.blocked_until <= now:
+                del self._chats[chat_id]
+
+    async def _wait_turn(self, chat_id: Optional[int]):
+        wait = self.global_bucket.reserve()
+        if chat_id is not None:
+            wait = max(wait, self._chat_bucket(chat_id).reserve())
+        if wait > 0:
+            self.stats['delayed'] += 1
+            self.stats['wait_seconds'] += wait
+            await asyncio.sleep(wait)
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            # getUpdates and other calls not addressed to a chat are not message limited
+            return await make_request(bot, method)
+
+        self.stats['calls'] += 1
+        attempt = 0
+        while True:
+            await self._wait_turn(chat_id)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.stats['retry_after'] += 1
+                attempt += 1
+                if attempt > self.max_retries:
+                    self.stats['gave_up'] += 1
+                    raise
+                logger.warning(f"Telegram flood limit for chat {chat_id}, retrying in {e.retry_after}s")
+                self._chat_bucket(chat_id).block(e.retry_after)
+
+    def get_stats(self) -> Dict:
+        """Get pacing counters"""
+        stats = dict(self.stats)
+        stats['chats'] = len(self._chats)
+        return stats
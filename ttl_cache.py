@@ -0,0 +1,72 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """In-process LRU cache bounded by entry count, with a time-to-live per kind of entry"""
+    def __init__(self, max_entries: int = 512, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self._entries: OrderedDict = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+    def get(self, kind: str, key: Hashable) -> Optional[Any]:
+        """Get a live entry and mark it as recently used, or None"""
+        entry_key = (kind, key)
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[entry_key]
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(entry_key)
+        self.stats['hits'] += 1
+        return value
+
+    def set(self, kind: str, key: Hashable, value: Any):
+        """Store an entry, evicting the least recently used ones past the size bound"""
+        entry_key = (kind, key)
+        ttl = self.ttls.get(kind, self.default_ttl)
+        self._entries[entry_key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def invalidate(self, kind: str, key: Hashable):
+        """Drop a single entry"""
+        self._entries.pop((kind, key), None)
+
+    def clear(self, kind: Optional[str] = None) -> int:
+        """Drop every entry, or every entry of one kind, returning how many were removed"""
+        if kind is None:
+            removed = len(self._entries)
+            self._entries.clear()
+        else:
+            keys = [entry_key for entry_key in self._entries if entry_key[0] == kind]
+            for entry_key in keys:
+                del self._entries[entry_key]
+            removed = len(keys)
+        logger.info(f"Cleared {removed} cache entries" + (f" of kind {kind}" if kind else ""))
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and entry counts per kind"""
+        stats = dict(self.stats)
+        stats['entries'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        per_kind = {}
+        for kind, _ in self._entries:
+            per_kind[kind] = per_kind.get(kind, 0) + 1
+        stats['per_kind'] = per_kind
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
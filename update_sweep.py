@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+class SweepReport:
+    """Outcome and timings of one update sweep"""
+    def __init__(self):
+        self.updates: List[Tuple[str, str]] = []
+        self.duration = 0.0
+        self.detect_duration = 0.0
+        self.site_timings: Dict[str, Dict] = {}
+        self.errors = 0
+
+    def summary(self) -> str:
+        """Human-readable timing summary"""
+        lines = [f"Sweep took {self.duration:.1f}s (detection {self.detect_duration:.1f}s)"]
+        for site, timing in sorted(self.site_timings.items()):
+            lines.append(
+                f"  {site}: {timing['series']} series in {timing['seconds']:.1f}s, "
+                f"{timing['new_chapters']} new chapters"
+            )
+        return "\n".join(lines)
+
+class UpdateSweep:
+    """Concurrent update sweep: detect per site under its own budget, deliver from a queue"""
+    def __init__(self, scraper_manager, deliver: Callable[..., Awaitable[List[Tuple[str, str]]]],
+                 workers: int = 8, per_site: int = 3, delivery_workers: int = 2):
+        self.scraper = scraper_manager
+        self.deliver = deliver
+        self.workers = workers
+        self.per_site = per_site
+        self.delivery_workers = delivery_workers
+
+    @classmethod
+    def from_config(cls, scraper_manager, deliver, config) -> 'UpdateSweep':
+        """Build a sweep from the SWEEP_* settings in Config"""
+        return cls(
+            scraper_manager,
+            deliver,
+            workers=config.SWEEP_WORKERS,
+            per_site=config.SWEEP_SITE_CONCURRENCY,
+            delivery_workers=config.SWEEP_DELIVERY_WORKERS,
+        )
+
+    async def run(self, manhwa_list) -> SweepReport:
+        """Check every series concurrently and hand new chapters to the delivery workers"""
+        report = SweepReport()
+        started = time.monotonic()
+
+        # Group by site so each domain gets its own concurrency budget
+        groups: Dict[str, list] = {}
+        for manhwa in manhwa_list:
+            groups.setdefault(self.scraper.get_domain(manhwa.url), []).append(manhwa)
+
+        global_slots = asyncio.Semaphore(self.workers)
+        found: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+
+        async def detect(site: str, manhwa, site_slots: asyncio.Semaphore):
+            async with site_slots, global_slots:
+                logger.info(f"Checking {manhwa.name}")
+                new_chapters = await self.scraper.check_new_chapters(manhwa)
+            report.site_timings[site]['new_chapters'] += len(new_chapters)
+            if new_chapters:
+                await found.put((manhwa, new_chapters))
+
+        async def sweep_site(site: str, series: list):
+            site_started = time.monotonic()
+            report.site_timings[site] = {'series': len(series), 'seconds': 0.0, 'new_chapters': 0}
+            site_slots = asyncio.Semaphore(self.per_site)
+            await asyncio.gather(*(detect(site, manhwa, site_slots) for manhwa in series))
+            report.site_timings[site]['seconds'] = time.monotonic() - site_started
+
+        async def deliver_worker():
+            while True:
+                item = await found.get()
+                try:
+                    if item is None:
+                        return
+                    manhwa, new_chapters = item
+                    try:
+                        report.updates.extend(await self.deliver(manhwa, new_chapters))
+                    except Exception as e:
+                        report.errors += 1
+                        logger.error(f"Error delivering updates for {manhwa.name}: {e}")
+                finally:
+                    found.task_done()
+
+        delivery_tasks = [asyncio.create_task(deliver_worker()) for _ in range(self.delivery_workers)]
+        try:
+            # Detection and delivery overlap: chapters are delivered while other series are checked
+            await asyncio.gather(*(sweep_site(site, series) for site, series in groups.items()))
+            report.detect_duration = time.monotonic() - started
+            for _ in delivery_tasks:
+                await found.put(None)
+            await asyncio.gather(*delivery_tasks)
+        finally:
+            for task in delivery_tasks:
+                task.cancel()
+
+        report.duration = time.monotonic() - started
+        logger.info(report.summary())
+        return report
@@ -0,0 +1,67 @@
+import logging
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+# Fonts and rendered text overlays are cached per process, so a chapter pays for them
+# once and every page afterwards is a single masked paste onto its corner.
+
+class WatermarkStyle(NamedTuple):
+    """How big, how far from the corner and in which colour the watermark text is drawn"""
+    font_ratio: float = 0.05  # font size relative to the page height
+    padding_ratio: float = 0.02  # distance from the bottom right corner relative to the page size
+    fill: Tuple[int, int, int, int] = (128, 128, 128, 128)
+
+DEFAULT_STYLE = WatermarkStyle()
+# Very subtle watermark: 0.8% font, 0.5% padding, mostly transparent
+SUBTLE_STYLE = WatermarkStyle(font_ratio=0.008, padding_ratio=0.005, fill=(128, 128, 128, 64))
+
+def size_bucket(font_size: int) -> int:
+    """Round a font size down to one of a few steps so similar pages share an overlay"""
+    step = max(1, font_size // 8)
+    return max(1, font_size // step * step)
+
+@lru_cache(maxsize=32)
+def get_font(size: int) -> ImageFont.ImageFont:
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        pass
+    try:
+        # Pillow 10.1+ ships a scalable default font
+        return ImageFont.load_default(size)
+    except TypeError:
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=64)
+def get_overlay(text: str, font_size: int, fill: Tuple[int, int, int, int]) -> Image.Image:
+    """Render text once as an RGBA tile cropped to its ink, alpha carrying the transparency"""
+    font = get_font(font_size)
+    left, top, right, bottom = font.getbbox(text)
+    size = (max(1, right - left), max(1, bottom - top))
+
+    # Glyph coverage scaled by the fill's alpha becomes the paste mask
+    mask = Image.new('L', size, 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+    alpha = fill[3]
+    if alpha < 255:
+        mask = mask.point(lambda value: value * alpha // 255)
+
+    overlay = Image.new('RGBA', size, fill[:3] + (0,))
+    overlay.putalpha(mask)
+    return overlay
+
+def apply_watermark(img: Image.Image, text: str, style: WatermarkStyle = DEFAULT_STYLE) -> Image.Image:
+    """Blend the cached text overlay into the bottom right corner of img in place
+
+    img must be RGB or RGBA; only the corner region the overlay covers is touched.
+    """
+    width, height = img.size
+    overlay = get_overlay(text, size_bucket(int(height * style.font_ratio)), tuple(style.fill))
+    x = width - overlay.width - int(width * style.padding_ratio)
+    y = height - overlay.height - int(height * style.padding_ratio)
+    img.paste(overlay, (max(0, x), max(0, y)), overlay)
+    return img